@@ -1,5 +1,15 @@
 #!/usr/bin/env python3
 
+import sys
+
+if __name__ == "__main__" and len(sys.argv) > 1:
+    # Command line use (see cli.py) is handled before Qt is even imported
+    from cli import COMMANDS, main as cli_main
+    if sys.argv[1] in COMMANDS:
+        sys.exit(cli_main())
+
+from array import array
+
 from PyQt6.QtWidgets import (
     QApplication, 
     QWidget,
@@ -15,17 +25,27 @@ from PyQt6.QtWidgets import (
     QCheckBox,
     QGridLayout,
     QMessageBox,
-    QTableWidget,
-    QTableWidgetItem,
-    QHeaderView
+    QTableView,
+    QHeaderView,
+    QProgressBar,
+    QTabBar,
+    QInputDialog
 )
-from PyQt6.QtCore import QTimer, QUrl, Qt, QSize
+from PyQt6.QtCore import QTimer, QUrl, Qt, QSize, QAbstractTableModel, QModelIndex, QObject, QThread, pyqtSignal, QFileSystemWatcher
 from PyQt6.QtGui import QTextCursor, QDesktopServices, QFont
 from datetime import datetime
-import csv
-import sys
+from bisect import bisect_left
+from itertools import chain
 import configparser
 import os
+import shutil
+import time
+
+from event_index import EventIndex, parse_bound
+from event_store import EventStore, datetime_stamp, format_date, format_time, pack_stamp, to_ranges
+from logs import log, run_profiled, setup_logging, timed
+from storage import add_events, is_sqlite, migrate, open_journal
+from workspace import OpenLog, Workspace
 
 
 class CustomDialog(QDialog):
@@ -50,6 +70,10 @@ class CustomDialog(QDialog):
         self.loadButton.clicked.connect(self.on_load)
         button_layout.addWidget(self.loadButton)
 
+        self.readOnlyButton = QPushButton("Open Read-Only")
+        self.readOnlyButton.clicked.connect(self.on_read_only)
+        button_layout.addWidget(self.readOnlyButton)
+
         # Add the horizontal layout to the main layout
         layout.addLayout(button_layout)
 
@@ -71,11 +95,377 @@ class CustomDialog(QDialog):
         self.clicked_button = 'load'
         self.accept()
 
+    def on_read_only(self):
+        self.clicked_button = 'read_only'
+        self.accept()
+
     def on_exit(self):
         self.clicked_button = 'exit'
         self.reject()
 
+class EventTableModel(QAbstractTableModel):
+    """Table model reading straight from an EventStore.
+
+    Cells are formatted on demand, so the view only ever touches the rows
+    that are actually on screen. The store can be swapped for a read-only
+    MappedCsvLog to browse archived logs without loading them.
+
+    A filter shows only the store rows returned by a search function. While
+    it is active, changes to the store re-run the search and reset the view.
+    """
+
+    headers = ["Date", "Time", "Event"]
+
+    edited = pyqtSignal(object, object)  # (stamp, event) of the row before and after
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.editable = True
+        self.search = None
+        self.visible = None
+
+    def set_store(self, store, editable=True):
+        self.beginResetModel()
+        self.store = store
+        self.editable = editable
+        self.search = None
+        self.visible = None
+        self.endResetModel()
+
+    def set_filter(self, search):
+        self.beginResetModel()
+        self.search = search
+        self.visible = search() if search is not None else None
+        self.endResetModel()
+
+    def source_row(self, row):
+        return row if self.visible is None else self.visible[row]
+
+    def view_row(self, position):
+        # Row showing this store position, None if it's filtered out
+        if self.visible is None:
+            return position
+        row = bisect_left(self.visible, position)
+        if row < len(self.visible) and self.visible[row] == position:
+            return row
+        return None
+
+    def change_filtered(self, change):
+        self.beginResetModel()
+        try:
+            return change()
+        finally:
+            self.visible = self.search()
+            self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.store) if self.visible is None else len(self.visible)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role not in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            return None
+        return self.store.cell(self.source_row(index.row()), index.column())
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self.headers[section]
+        return self.source_row(section) + 1
+
+    def flags(self, index):
+        if not index.isValid() or not self.editable:
+            return super().flags(index)
+        return super().flags(index) | Qt.ItemFlag.ItemIsEditable
+
+    @timed
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if not index.isValid() or role != Qt.ItemDataRole.EditRole:
+            return False
+        row, column = self.source_row(index.row()), index.column()
+        value = str(value).strip()
+        old = (self.store.stamps[row], self.store.events[row])
+        if column == 2:
+            if value == old[1]:
+                return True  # Nothing to save
+            if self.visible is not None:
+                self.change_filtered(lambda: self.store.set_event(row, value))
+            else:
+                self.store.set_event(row, value)
+                self.dataChanged.emit(index, index)
+            self.edited.emit(old, (old[0], value))
+            return True
+        date, time = self.store.row(row)[:2]
+        try:
+            stamp = pack_stamp(value, time) if column == 0 else pack_stamp(date, value)
+        except ValueError:
+            return False  # Keep the old value
+        if stamp == old[0]:
+            return True
+        # A new date or time can move the row to keep the table sorted
+        position = self.store.insertion_point(stamp, moving=row)
+        if self.visible is not None:
+            self.change_filtered(lambda: self.store.set_stamp(row, stamp))
+        elif position == row:
+            self.store.set_stamp(row, stamp)
+            self.dataChanged.emit(self.index(row, 0), self.index(row, 1))
+        else:
+            self.beginMoveRows(QModelIndex(), row, row, QModelIndex(), position if position < row else position + 1)
+            self.store.set_stamp(row, stamp)
+            self.endMoveRows()
+            self.dataChanged.emit(self.index(position, 0), self.index(position, 1))
+        self.edited.emit(old, (stamp, old[1]))
+        return True
+
+    def clear(self):
+        self.beginResetModel()
+        self.store.clear()
+        if self.search is not None:
+            self.visible = self.search()
+        self.endResetModel()
+
+    def insert(self, stamp, event):
+        # Returns the position in the store
+        if self.visible is not None:
+            return self.change_filtered(lambda: self.store.insert(stamp, event))
+        row = self.store.insertion_point(stamp)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.store.insert(stamp, event)
+        self.endInsertRows()
+        return row
+
+    def extend(self, stamps, events):
+        if not stamps:
+            return True
+        if self.visible is not None:
+            return self.change_filtered(lambda: self.store.extend(stamps, events))
+        if self.store.is_in_order(stamps):
+            first = len(self.store)
+            self.beginInsertRows(QModelIndex(), first, first + len(stamps) - 1)
+            self.store.extend(stamps, events)
+            self.endInsertRows()
+            return True
+        self.beginResetModel()
+        self.store.extend(stamps, events)
+        self.endResetModel()
+        return False
+
+    def prepend(self, stamps, events):
+        # Older rows, which usually all go before the first one
+        if self.visible is not None or (len(self.store) and stamps[-1] > self.store.stamps[0]):
+            return self.extend(stamps, events)
+        self.beginInsertRows(QModelIndex(), 0, len(stamps) - 1)
+        self.store.prepend(stamps, events)
+        self.endInsertRows()
+        return True
+
+    def remove_rows(self, ranges):
+        # Takes sorted (start, stop) ranges of table rows, returns the stamps
+        # and events of the removed rows
+        if self.visible is not None:
+            ranges = to_ranges(chain.from_iterable(self.visible[start:stop] for start, stop in ranges))
+        return self.remove_positions(ranges)
+
+    def remove_positions(self, ranges):
+        # Same with ranges of store positions. Each range goes in one
+        # operation, and the view is told once.
+        stamps, events = array('q'), []
+        for start, stop in ranges:
+            stamps += self.store.stamps[start:stop]
+            events += self.store.events[start:stop]
+        if not ranges:
+            return stamps, events
+        if self.visible is not None:
+            self.change_filtered(lambda: self.store.remove_ranges(ranges))
+        elif len(ranges) == 1:
+            start, stop = ranges[0]
+            self.beginRemoveRows(QModelIndex(), start, stop - 1)
+            self.store.remove_ranges(ranges)
+            self.endRemoveRows()
+        else:
+            self.beginResetModel()
+            self.store.remove_ranges(ranges)
+            self.endResetModel()
+        return stamps, events
+
+
+LOG_FILTERS = "Event Logs (*.csv *.sqlite *.sqlite3 *.db);;CSV Files (*.csv);;SQLite Databases (*.sqlite *.sqlite3 *.db);;All Files (*)"
+
+
+class LogLoader(QObject):
+    """Reads an event log on a worker thread and hands it over in batches."""
+
+    # Every signal carries the loader, so that batches still queued from a
+    # cancelled load can be told apart from the current one
+    batch_loaded = pyqtSignal(object, object, object, object, int)  # loader, stamps, events, errors, percent
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(object, str)
+
+    def __init__(self, file_path):
+        super().__init__()
+        self.file_path = file_path
+        self.newest_first = open_journal(file_path).newest_first
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        try:
+            journal = open_journal(self.file_path)
+            batches = journal.read_batches(newest_first=True) if self.newest_first else journal.read_batches()
+            for stamps, events, errors, done in batches:
+                if self.cancelled:
+                    return
+                self.batch_loaded.emit(self, stamps, events, errors, int(done * 100))
+            self.finished.emit(self)
+        except Exception as e:
+            self.failed.emit(self, str(e))
+        finally:
+            QThread.currentThread().quit()
+
+
+class IndexLoader(LogLoader):
+    """Builds the row index of a log opened read-only on a worker thread."""
+
+    progress = pyqtSignal(object, int)  # loader, percent
+    indexed = pyqtSignal(object, object)  # loader, mapped log
+
+    def run(self):
+        # Imported here, most sessions never open a log read-only
+        from mapped_log import Cancelled, MappedCsvLog
+
+        try:
+            self.indexed.emit(self, MappedCsvLog(self.file_path, progress=self.report))
+        except Cancelled:
+            pass
+        except Exception as e:
+            self.failed.emit(self, str(e))
+        finally:
+            QThread.currentThread().quit()
+
+    def report(self, done):
+        if self.cancelled:
+            return False
+        self.progress.emit(self, int(done * 100))
+        return True
+
+
+class EventServer(QObject):
+    """Accepts events from other programs on a local socket.
+
+    Clients send one event per line (see `EventRecorder.py send`). Each event
+    is timestamped when it's received, and events arriving in a burst are
+    handed over together in a single `received` signal.
+    """
+
+    received = pyqtSignal(object, object)  # stamps, events
+
+    max_line = 1024 * 1024
+
+    def __init__(self, address, parent=None):
+        # QtNetwork is only loaded when the server is first started
+        from PyQt6.QtNetwork import QLocalServer
+
+        super().__init__(parent)
+        self.address = address
+        self.server = QLocalServer(self)
+        self.server.newConnection.connect(self.accept)
+        self.buffers = {}
+        self.stamps = array('q')
+        self.events = []
+        self.batch_timer = QTimer(self)
+        self.batch_timer.setSingleShot(True)
+        self.batch_timer.timeout.connect(self.hand_over)
+
+    def start(self):
+        # Don't steal the socket from another running instance, but clean up
+        # the one left behind by a crash
+        from PyQt6.QtNetwork import QLocalSocket
+
+        probe = QLocalSocket()
+        probe.connectToServer(self.address)
+        if probe.waitForConnected(100):
+            probe.disconnectFromServer()
+            raise OSError(f"Another EventRecorder is already listening on {self.address}")
+        self.server.removeServer(self.address)
+        if not self.server.listen(self.address):
+            raise OSError(self.server.errorString())
+
+    def stop(self):
+        self.server.close()
+        for connection in list(self.buffers):
+            connection.abort()
+        self.hand_over()
+
+    def accept(self):
+        while self.server.hasPendingConnections():
+            connection = self.server.nextPendingConnection()
+            self.buffers[connection] = b""
+            connection.readyRead.connect(lambda connection=connection: self.read(connection))
+            connection.disconnected.connect(lambda connection=connection: self.close(connection))
+
+    def read(self, connection):
+        data = self.buffers.get(connection, b"") + bytes(connection.readAll())
+        *lines, rest = data.split(b"\n")
+        if len(rest) > self.max_line:
+            connection.abort()
+            rest = b""
+        self.buffers[connection] = rest
+        stamp = datetime_stamp(datetime.now())
+        for line in lines:
+            text = line.decode("utf-8", errors="replace").strip()
+            if text:
+                self.stamps.append(stamp)
+                self.events.append(sys.intern(text))
+        # Wait a little for the rest of a burst, but never more than that
+        if self.events and not self.batch_timer.isActive():
+            self.batch_timer.start(20)
+
+    def close(self, connection):
+        rest = self.buffers.pop(connection, b"")
+        text = rest.decode("utf-8", errors="replace").strip()
+        if text:  # Last line without a newline
+            self.stamps.append(datetime_stamp(datetime.now()))
+            self.events.append(sys.intern(text))
+            self.batch_timer.start(0)
+        connection.deleteLater()
+
+    def hand_over(self):
+        self.batch_timer.stop()
+        if self.events:
+            stamps, events = self.stamps, self.events
+            self.stamps, self.events = array('q'), []
+            self.received.emit(stamps, events)
+
+
+def config_stat(path):
+    # What tells a config file that was saved apart from an untouched one
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
 class EventRecorder(QWidget):
+    # Edits are written behind: once they stop for flush_delay ms, at most
+    # flush_max_delay ms after the first one, or as soon as flush_rows rows
+    # have changed
+    flush_delay = 500
+    flush_max_delay = 5000
+    flush_rows = 1000
+    # Reports leave out durations longer than this many minutes, like the
+    # night between the last event of a day and the first of the next
+    report_max_gap = 240
+    # The filter runs once the entries haven't changed for this many ms
+    filter_delay = 150
                 
     def create_config(self):
         config = configparser.ConfigParser()
@@ -110,9 +500,9 @@ class EventRecorder(QWidget):
         else: #  replace [DEFAULT] with [BUTTONS] (due to a braking change). TODO: the whole else should be removed in the future. No one should have [DEFAULT] in their config file.
             with open(config_file_path, 'r') as configfile:                 
                 file_contents = configfile.read()                           
-            file_contents = file_contents.replace('[DEFAULT]', '[BUTTONS]') 
-            with open(config_file_path, 'w') as configfile:
-                configfile.write(file_contents)
+            if '[DEFAULT]' in file_contents:  # Don't rewrite the file on every start
+                with open(config_file_path, 'w') as configfile:
+                    configfile.write(file_contents.replace('[DEFAULT]', '[BUTTONS]'))
 
         return config_file_path
     
@@ -122,9 +512,20 @@ class EventRecorder(QWidget):
         QApplication.instance().focusChanged.connect(self.check_focus)
              
         self.csv_file_path = ''
+        self.journal = None
+        self.loader = None
+        self.history_loader = None  # Reads the older events of a log already shown
+        self.mapped_log = None
+        self.workspace = Workspace()
+        self.active_log = None
+        self.server = None
+        self.received_stamps = array('q')
+        self.received_events = []
+        self.store = EventStore()
         self.stop_clock_when_typing = QCheckBox('Stop clock when typing')
         self.event_entry = QPlainTextEdit()
         self.clock_label = QLineEdit()
+        self.clock_running = None
         
         config_file_path = self.create_config()
         
@@ -132,9 +533,19 @@ class EventRecorder(QWidget):
         self.setWindowTitle("Event Recorder")
         self.setGeometry(100, 100, 950, 400)
                 
+        # Wakes up right after each second boundary instead of polling
         self.timer = QTimer()
-        self.timer.start(200)  # Update every 0.2 seconds
-        self.timer.timeout.connect(self.update_clock)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.timeout.connect(self.tick_clock)
+
+        self.flush_timer = QTimer()
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.timeout.connect(self.flush_journal)
+        self.flush_deadline = QTimer()
+        self.flush_deadline.setSingleShot(True)
+        self.flush_deadline.timeout.connect(self.flush_journal)
+        QApplication.instance().aboutToQuit.connect(self.flush_journal)
         
         self.main_layout = QHBoxLayout()
 
@@ -147,7 +558,24 @@ class EventRecorder(QWidget):
         self.file_path_display.setReadOnly(True)
         self.file_path_display.setText(self.csv_file_path) 
         self.file_path_layout.addWidget(self.file_path_display)
+        self.load_progress = QProgressBar()
+        self.load_progress.setVisible(False)
+        self.file_path_layout.addWidget(self.load_progress)
+        self.cancel_load_button = QPushButton('Cancel')
+        self.cancel_load_button.setVisible(False)
+        self.cancel_load_button.clicked.connect(self.cancel_loading)
+        self.file_path_layout.addWidget(self.cancel_load_button)
         self.left_column_layout.addLayout(self.file_path_layout)
+
+        # One tab per open log
+        self.tabs = QTabBar()
+        self.tabs.setTabsClosable(True)
+        self.tabs.setMovable(True)
+        self.tabs.setDocumentMode(True)
+        self.tabs.setExpanding(False)
+        self.tabs.currentChanged.connect(self.switch_tab)
+        self.tabs.tabCloseRequested.connect(self.close_tab)
+        self.left_column_layout.addWidget(self.tabs)
         
         self.load_grid = QGridLayout()
         self.right_column_layout.addLayout(self.load_grid)
@@ -157,19 +585,59 @@ class EventRecorder(QWidget):
         self.load_grid.addWidget(self.save_button, 0, 0)
 
         self.load_button = QPushButton('Load File')
+        self.load_button.setToolTip("Open a log in a new tab.")
         self.load_button.clicked.connect(self.load_csv)
         self.load_grid.addWidget(self.load_button, 0, 1)
+
+        self.read_only_button = QPushButton('Open Read-Only')
+        self.read_only_button.setToolTip("Browse a large log without loading it into memory. Events can't be recorded or edited.")
+        self.read_only_button.clicked.connect(self.open_read_only)
+        self.load_grid.addWidget(self.read_only_button, 1, 0)
+
+        self.report_button = QPushButton('Export Report')
+        self.report_button.setToolTip("Save the time spent on each event, per day and per week, as CSV or JSON. Limited to the From/To dates when they are set.")
+        self.report_button.clicked.connect(self.export_report)
+        self.load_grid.addWidget(self.report_button, 1, 1)
+
+        self.new_button = QPushButton('New File')
+        self.new_button.setToolTip("Start a new, empty log in a new tab.")
+        self.new_button.clicked.connect(lambda: self.choose_save_location(new=True))
+        self.load_grid.addWidget(self.new_button, 2, 0)
         
-        self.table = QTableWidget(self)
-        self.table.setColumnCount(3)  # Adjust this to match the number of columns in your CSV
-        self.table.setHorizontalHeaderLabels(["Date", "Time", "Event"])  # Adjust these to match the headers of your CSV
+        self.filter_layout = QHBoxLayout()
+        self.search_entry = QLineEdit()
+        self.search_entry.setPlaceholderText("Search events...")
+        self.search_entry.setClearButtonEnabled(True)
+        self.filter_layout.addWidget(self.search_entry)
+        self.from_entry = QLineEdit()
+        self.from_entry.setPlaceholderText("From (YYYY-MM-DD)")
+        self.filter_layout.addWidget(self.from_entry)
+        self.to_entry = QLineEdit()
+        self.to_entry.setPlaceholderText("To (YYYY-MM-DD)")
+        self.filter_layout.addWidget(self.to_entry)
+        # Waits for a pause in the typing, each search goes through the index
+        self.filter_timer = QTimer()
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.timeout.connect(self.apply_filter)
+        for entry in (self.search_entry, self.from_entry, self.to_entry):
+            entry.textChanged.connect(lambda: self.filter_timer.start(self.filter_delay))
+        self.left_column_layout.addLayout(self.filter_layout)
+
+        self.model = EventTableModel(self.store, self)
+        self.table = QTableView(self)
+        self.table.setModel(self.model)
         header = self.table.horizontalHeader()
         header.setSectionResizeMode(0, QHeaderView.ResizeMode.ResizeToContents)
         header.setSectionResizeMode(1, QHeaderView.ResizeMode.ResizeToContents)
         header.setSectionResizeMode(2, QHeaderView.ResizeMode.Stretch)
-        self.table.itemChanged.connect(self.update_table)
+        header.setResizeContentsPrecision(0)  # Only measure the visible rows
+        # Size rows from the font instead of measuring every row's contents
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.model.edited.connect(self.save_edit)
         self.table.setFont(QFont("TypeWriter"))
-        self.table.itemActivated.connect(self.copy_to_entry)
+        self.table.activated.connect(self.copy_to_entry)
+        self.edit_triggers = self.table.editTriggers()
+        self.table_empty = None
         self.left_column_layout.addWidget(self.table)
         
         
@@ -190,8 +658,15 @@ class EventRecorder(QWidget):
         self.right_column_layout.addWidget(self.auto_delete_checkbox)
         
         self.stop_clock_when_typing.setChecked(False)
+        self.stop_clock_when_typing.toggled.connect(lambda: self.update_clock())
+        self.event_entry.textChanged.connect(self.update_clock)
         self.right_column_layout.addWidget(self.stop_clock_when_typing)
 
+        self.server_checkbox = QCheckBox('Accept events from other programs')
+        self.server_checkbox.setToolTip("Listen for events sent with 'EventRecorder.py send', one per line.")
+        self.server_checkbox.toggled.connect(self.toggle_server)
+        self.right_column_layout.addWidget(self.server_checkbox)
+
         self.record_button = QPushButton('Record Event (Press Enter)')
         self.record_button.clicked.connect(lambda: self.record_event(self.event_entry.toPlainText().strip(), None, self.update_clock(False)))
         self.right_column_layout.addWidget(self.record_button)
@@ -199,13 +674,37 @@ class EventRecorder(QWidget):
         self.delete_button = QPushButton('Delete Selected')
         self.delete_button.clicked.connect(self.delete_selected)
         self.right_column_layout.addWidget(self.delete_button)
+
+        self.prune_layout = QHBoxLayout()
+        self.delete_before_button = QPushButton('Delete Before...')
+        self.delete_before_button.setToolTip("Delete all the events before a date.")
+        self.delete_before_button.clicked.connect(lambda: self.delete_before(archive=False))
+        self.prune_layout.addWidget(self.delete_before_button)
+        self.archive_button = QPushButton('Archive Before...')
+        self.archive_button.setToolTip("Move all the events before a date to another log, new or existing.")
+        self.archive_button.clicked.connect(lambda: self.delete_before(archive=True))
+        self.prune_layout.addWidget(self.archive_button)
+        self.right_column_layout.addLayout(self.prune_layout)
         
         self.button1_grid = QGridLayout()
         
         self.button2_grid = QGridLayout()
+        self.quick_buttons = {}  # Name in the config -> (button, event text)
                 
         self.load_config(config_file_path)
 
+        # Reload the buttons as soon as the config file is saved. Editors
+        # often replace the file instead of writing to it, which drops it
+        # from the watcher, so its directory is watched too. Anything else
+        # changing in that directory leaves the file's size and modification
+        # time alone, and doesn't reload anything.
+        self.config_timer = QTimer()
+        self.config_timer.setSingleShot(True)
+        self.config_timer.timeout.connect(lambda: self.load_config(config_file_path, quiet=True))
+        self.config_watcher = QFileSystemWatcher([config_file_path, os.path.dirname(config_file_path)])
+        self.config_watcher.fileChanged.connect(lambda: self.config_changed(config_file_path))
+        self.config_watcher.directoryChanged.connect(lambda: self.config_changed(config_file_path))
+
         # Add the grid to the right column layout
         self.left_column_layout.addLayout(self.button2_grid)
         
@@ -229,53 +728,204 @@ class EventRecorder(QWidget):
         if new != self.table and new != self.delete_button:
             self.table.clearSelection()
                 
+    def tick_clock(self):
+        self.update_clock()
+        self.timer.start(1000 - datetime.now().microsecond // 1000)
+
     def update_clock(self, forced=False):
+        # Only touches the widget when what it shows actually changes
         current_time = self.clock_label.text()
-        if forced or not self.stop_clock_when_typing.isChecked() or self.event_entry.toPlainText().strip() == '':
-            date = datetime.now().strftime("%Y-%m-%d")
-            time = datetime.now().strftime("%H:%M:%S")
-            current_time = date + ", " + time
-            self.clock_label.setText(current_time)
-            self.clock_label.setStyleSheet("background-color: rgb(230, 230, 230)")
-            self.clock_label.setReadOnly(True)
-        else:
-            self.clock_label.setReadOnly(False)
-            self.clock_label.setStyleSheet("background-color: none")
+        running = forced or not self.stop_clock_when_typing.isChecked() or self.event_entry.toPlainText().strip() == ''
+        if running:
+            current_time = datetime.now().strftime("%Y-%m-%d, %H:%M:%S")
+            if current_time != self.clock_label.text():
+                self.clock_label.setText(current_time)
+        if running != self.clock_running:
+            self.clock_running = running
+            self.clock_label.setReadOnly(running)
+            self.clock_label.setStyleSheet("background-color: rgb(230, 230, 230)" if running else "background-color: none")
         return current_time
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.tick_clock()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.timer.stop()
           
     
+    def set_csv_file_path(self, file):
+        # Moves the active log to another file
+        if file != self.csv_file_path and self.workspace.get(file) is not None:
+            raise ValueError(f"{file} is already open in another tab")
+        self.close_journal()
+        self.workspace.rename(self.active_log, file)
+        index = self.tabs.currentIndex()
+        self.tabs.setTabText(index, os.path.basename(file))
+        self.tabs.setTabToolTip(index, file)
+        self.tabs.setTabData(index, file)
+        self.csv_file_path = file
+        self.journal = open_journal(file)
+        self.file_path_display.setText(file)
+        self.record_received(array('q'), [])
+
+    def find_tab(self, path):
+        for index in range(self.tabs.count()):
+            if self.tabs.tabData(index) == path:
+                return index
+        return -1
+
+    def open_tab(self, log):
+        # Shows the log in a new tab, the active one stays open in its own.
+        # Returns False if the active log couldn't be saved and stays shown.
+        if not self.park_log():
+            return False
+        self.workspace.add(log)
+        self.tabs.blockSignals(True)
+        index = self.tabs.addTab(os.path.basename(log.path))
+        self.tabs.setTabToolTip(index, log.path)
+        self.tabs.setTabData(index, log.path)
+        self.tabs.setCurrentIndex(index)
+        self.tabs.blockSignals(False)
+        self.show_log(log)
+        return True
+
+    def switch_tab(self, index):
+        log = self.workspace.get(self.tabs.tabData(index)) if index >= 0 else None
+        if log is None or log is self.active_log:
+            return
+        if not self.park_log():
+            # Stay on the log whose changes couldn't be saved
+            self.tabs.blockSignals(True)
+            self.tabs.setCurrentIndex(self.find_tab(self.active_log.path))
+            self.tabs.blockSignals(False)
+            return
+        self.show_log(log)
+
+    def park_log(self):
+        # Hands the state of the active log back to the workspace, only once
+        # its changes are saved: a parked log is never flushed again
+        log = self.active_log
+        if log is None:
+            return True
+        if not self.flush_journal():
+            return False
+        log.store, log.journal, log.mapped_log = self.store, self.journal, self.mapped_log
+        self.workspace.deactivate(log)
+        self.active_log = None
+        return True
+
+    @timed
+    def show_log(self, log):
+        # Reactivating a log reuses its store, search index included, or
+        # reads back its snapshot if it was evicted
+        self.active_log = log
+        self.store = self.workspace.activate(log)
+        self.journal = log.journal
+        self.mapped_log = log.mapped_log
+        self.csv_file_path = log.path
+        self.file_path_display.setText(log.path)
+        if self.mapped_log is not None:
+            self.model.set_store(self.mapped_log, editable=False)
+        else:
+            self.model.set_store(self.store)
+            self.apply_filter()
+        self.set_read_only(self.mapped_log is not None)
+        self.refresh_table()
+        self.record_received(array('q'), [])
+
+    def close_tab(self, index):
+        log = self.workspace.get(self.tabs.tabData(index))
+        if log is self.active_log:
+            if self.history_loader is not None:
+                self.stop_history()
+            if not self.flush_journal():
+                return
+            log.journal, log.mapped_log = self.journal, self.mapped_log
+            self.active_log = None
+            self.journal = None
+            self.mapped_log = None
+            self.store = EventStore()
+            self.model.set_store(self.store)
+        self.workspace.remove(log)
+        self.tabs.removeTab(index)  # Shows the next tab, if any
+        if self.active_log is None:
+            self.csv_file_path = ''
+            self.file_path_display.setText('')
+            self.set_read_only(False)
+            self.refresh_table()
+            self.choose_file()
+
+    @timed
     def write_table_to_csv(self):
-        with open(self.csv_file_path, mode="w", newline="") as file:
-            writer = csv.writer(file)
-            for row in range(self.table.rowCount()):
-                row_data = []
-                for column in range(self.table.columnCount()):
-                    item = self.table.item(self.table.visualRow(row), column)
-                    if item is not None:
-                        row_data.append(item.text())
-                    else:
-                        row_data.append('')
-                writer.writerow(row_data)
+        self.journal.save(self.store)
 
-    def record_event(self, text=None, button=None, current_time=None):
+    def schedule_flush(self):
+        # The journal has been told what changed, this decides when to save it
+        if self.journal.dirty >= self.flush_rows:
+            self.flush_journal()
+            return
+        self.flush_timer.start(self.flush_delay)
+        if not self.flush_deadline.isActive():
+            self.flush_deadline.start(self.flush_max_delay)
+
+    @timed
+    def flush_journal(self):
+        # Returns False if the changes couldn't be saved
+        self.flush_timer.stop()
+        self.flush_deadline.stop()
+        if self.journal is None or not self.journal.dirty:
+            return True
+        rows = self.journal.dirty
         try:
-            self.table.itemChanged.disconnect(self.update_table)  # Disconnect the signal
-        except TypeError:
-            pass  # Signal was not connected
+            self.journal.flush(self.store)
+        except OSError as e:
+            log.error("Saving %s failed: %s", self.csv_file_path, e)
+            QMessageBox.critical(self, "Error", f"Error saving file: {e}")
+            return False
+        log.debug("Saved %d changed rows to %s", rows, self.csv_file_path)
+        return True
+
+    def close_journal(self):
+        if self.journal is not None:
+            self.flush_journal()
+            self.journal.close()
+            self.journal = None
+
+    @timed
+    def record_event(self, text=None, button=None, current_time=None):
+        if self.loader is not None or self.mapped_log is not None:
+            return  # Wait for the file to be loaded, or read-only
         event_text = text if text is not None else self.event_entry.toPlainText().strip()
         
         if not event_text:  # If event_text is empty
             self.event_entry.clear() # to prevent enter key from being recorded
             return  # Return early
         
-        row_count = self.table.rowCount()
-        self.table.insertRow(row_count)
-        self.table.setItem(row_count, 0, QTableWidgetItem(current_time.split(", ", 1)[0]))
-        self.table.setItem(row_count, 1, QTableWidgetItem(current_time.split(", ", 1)[1]))
-        self.table.setItem(row_count, 2, QTableWidgetItem(event_text))
-        self.table.scrollToItem(self.table.item(row_count, 0))
-
-        self.write_table_to_csv()
+        # The clock can be edited while the entry has text in it
+        try:
+            date, time = current_time.split(", ", 1)
+            stamp = pack_stamp(date, time)
+        except ValueError:
+            QMessageBox.warning(self, "Invalid Time", f"'{current_time}' isn't a valid time, it should look like "
+                                "'YYYY-MM-DD, HH:MM:SS'. The event wasn't recorded.")
+            text = self.event_entry.toPlainText()
+            if text.endswith("\n"):
+                self.event_entry.setPlainText(text[:-1])  # Only drop the Enter
+            return
+        position = self.model.insert(stamp, event_text)
+        row = self.model.view_row(position)
+        if row is not None:
+            self.table.scrollTo(self.model.index(row, 0))
+
+        try:
+            saved = self.journal.inserted(self.store, position)
+        except OSError as e:
+            self.write_failed(e)
+            saved = False
+        if not saved:
+            self.schedule_flush()
         
         if self.auto_delete_checkbox.isChecked() and button is None:        
             self.event_entry.clear()
@@ -290,123 +940,510 @@ class EventRecorder(QWidget):
             cursor.movePosition(QTextCursor.MoveOperation.End)
             self.event_entry.setTextCursor(cursor)
         
-        self.update_table()
-        self.table.itemChanged.connect(self.update_table)  # Reconnect the signal
-        
-    def update_table(self):
-        print("Updating table at ", datetime.now().strftime("%H:%M:%S"))
-        if self.table.rowCount() == 0:
+        self.refresh_table()
+
+    def toggle_server(self, enabled):
+        if enabled and self.server is None:
+            from cli import server_address
+
+            self.server = EventServer(server_address(), self)
+            self.server.received.connect(self.record_received)
+            try:
+                self.server.start()
+            except OSError as e:
+                self.server = None
+                self.server_checkbox.setChecked(False)
+                QMessageBox.warning(self, "Error", f"Can't accept events from other programs: {e}")
+        elif not enabled and self.server is not None:
+            self.server.stop()
+            self.server.deleteLater()
+            self.server = None
+
+    @timed
+    def record_received(self, stamps, events):
+        self.received_stamps.extend(stamps)
+        self.received_events.extend(events)
+        if self.journal is None:
+            return  # Kept until a file can be written again
+        stamps, events = self.received_stamps, self.received_events
+        self.received_stamps, self.received_events = array('q'), []
+        if not stamps:
+            return
+
+        # The whole burst is inserted at once and, in the usual case, written
+        # to the file with a single append
+        rows = [[format_date(stamp), format_time(stamp), event] for stamp, event in zip(stamps, events)]
+        in_order = self.model.extend(stamps, events)
+        try:
+            if in_order or not self.journal.sorted_appends:
+                self.journal.append_rows(rows)
+            else:
+                self.journal.log_rows(rows)
+                self.journal.mark_dirty(len(stamps))
+                self.schedule_flush()
+        except OSError as e:
+            self.write_failed(e)
+            self.schedule_flush()
+        log.debug("Recorded %d events from other programs", len(stamps))
+        self.refresh_table()
+
+    def write_failed(self, error):
+        # The journal keeps the events for the next flush
+        log.error("Saving %s failed: %s", self.csv_file_path, error)
+        QMessageBox.critical(self, "Error", f"Error saving the new events: {error}\n\nThey stay in the table, saving them will be tried again.")
+
+    def refresh_table(self):
+        # Restyling is expensive, only do it when switching to or from empty
+        empty = self.model.rowCount() == 0
+        if empty == self.table_empty:
+            return
+        self.table_empty = empty
+        if empty:
             # inform user that there are no events
             self.table.setStyleSheet("background-color: rgb(230, 230, 230)")
         else:
             self.table.setStyleSheet("background-color: none")
-        
-        # Sort the table by date and time
-        self.table.sortItems(1)
-        self.table.sortItems(0)
-        
-        self.write_table_to_csv()
+
+    def save_edit(self, old, new):
+        self.journal.edited(old, new)
+        self.update_table()
+
+    @timed
+    def update_table(self):
+        self.refresh_table()
+        self.schedule_flush()
                     
 
+    def filter_bounds(self):
+        bounds = []
+        for entry, end in ((self.from_entry, False), (self.to_entry, True)):
+            try:
+                bounds.append(parse_bound(entry.text(), end))
+                invalid = False
+            except ValueError:
+                bounds.append(None)
+                invalid = True
+            style = "background-color: rgb(255, 220, 220)" if invalid else ""
+            if entry.styleSheet() != style:
+                entry.setStyleSheet(style)
+        return bounds
+
+    @timed
+    def apply_filter(self):
+        text = self.search_entry.text()
+        start, end = self.filter_bounds()
+        if not text.strip() and start is None and end is None:
+            if self.model.search is not None:
+                self.model.set_filter(None)
+        else:
+            if self.store.index is None:
+                self.store.index = EventIndex(self.store)
+            index = self.store.index
+            if not index.valid:
+                index.rebuild()
+            self.model.set_filter(lambda: index.search(text, start, end))
+        self.refresh_table()
+
+    def clear_filter(self):
+        for entry in (self.search_entry, self.from_entry, self.to_entry):
+            entry.blockSignals(True)
+            entry.clear()
+            entry.blockSignals(False)
+        self.filter_timer.stop()
+        self.apply_filter()
+
+    def export_report(self):
+        # Imported here, the report module pulls in NumPy when it's available
+        from report import build_report, write_report
+
+        try:
+            file, _ = QFileDialog.getSaveFileName(self,"Select Location to Save Report", "report.csv","CSV Files (*.csv);;JSON Files (*.json)")
+            if not file:
+                return
+            gap, ok = QInputDialog.getInt(self, "Report", "Leave out durations longer than (minutes, 0 for none):",
+                                          self.report_max_gap, 0, 1000000)
+            if not ok:
+                return
+            self.report_max_gap = gap  # Proposed again next time
+            start, end = self.filter_bounds()
+            write_report(build_report(self.store.stamps, self.store.events, start, end, gap * 60 if gap else None), file)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Error saving report: {e}")
+
+    @timed
     def delete_selected(self):
-        selected_rows = list(set(index.row() for index in self.table.selectionModel().selectedRows()))
-        if not selected_rows:  # If no whole rows are selected, get rows of selected items
-            selected_rows = list(set(item.row() for item in self.table.selectedItems()))
-        for row in sorted(selected_rows, reverse=True):
-            self.table.removeRow(row)
+        if self.loader is not None or self.mapped_log is not None:
+            return
+        # Works on the ranges of the selection rather than on every selected
+        # cell. If no whole rows are selected, deletes the rows of the
+        # selected items.
+        selection = self.table.selectionModel().selection()
+        whole_rows = [part for part in selection if part.left() == 0 and part.right() == self.model.columnCount() - 1]
+        rows = []
+        for part in sorted(whole_rows or selection, key=lambda part: part.top()):
+            if rows and part.top() <= rows[-1][1]:
+                rows[-1][1] = max(rows[-1][1], part.bottom() + 1)
+            else:
+                rows.append([part.top(), part.bottom() + 1])
+        stamps, events = self.model.remove_rows(rows)
+        if stamps:
+            self.table.clearSelection()
+            self.table.scrollTo(self.model.index(min(rows[0][0], self.model.rowCount() - 1), 0))
+            self.journal.removed(stamps, events)
+            self.update_table()
 
-        self.write_table_to_csv()
-        self.update_table()
+    @timed
+    def delete_before(self, archive=False):
+        # Removes all the events before a date at once, after adding them to
+        # another log when archiving, and saves the log right away
+        if self.loader is not None or self.history_loader is not None or self.mapped_log is not None:
+            return
+        title = "Archive Old Events" if archive else "Delete Old Events"
+        text, ok = QInputDialog.getText(self, title, "Events before (YYYY-MM-DD, optionally followed by HH:MM:SS):",
+                                        text=self.from_entry.text().strip())
+        text = text.strip()
+        if not ok or not text:
+            return
+        try:
+            before = parse_bound(text)
+        except ValueError as e:
+            QMessageBox.critical(self, "Error", str(e))
+            return
+        count = bisect_left(self.store.stamps, before)
+        if not count:
+            QMessageBox.information(self, title, f"There are no events before {text}.")
+            return
+
+        if archive:
+            file, _ = QFileDialog.getSaveFileName(self, "Select the Archive, New or Existing", "archive.csv",
+                                                  "CSV Files (*.csv);;SQLite Databases (*.sqlite)",
+                                                  options=QFileDialog.Option.DontConfirmOverwrite)
+            if not file:
+                return
+            if os.path.abspath(file) == os.path.abspath(self.csv_file_path) or self.workspace.get(file) is not None:
+                QMessageBox.critical(self, "Error", f"{file} is open, close it before archiving to it.")
+                return
+            # The events are only removed once they are safely in the archive
+            old = EventStore()
+            old.stamps, old.events = self.store.stamps[:count], self.store.events[:count]
+            try:
+                add_events(file, old)
+            except Exception as e:
+                QMessageBox.critical(self, "Error", f"Error archiving the events: {e}")
+                return
+            log.info("Archived %d events to %s", count, file)
+        else:
+            answer = QMessageBox.question(self, title, f"Delete the {count} events before {text}? This can't be undone.")
+            if answer != QMessageBox.StandardButton.Yes:
+                return
+
+        self.model.remove_positions([(0, count)])
+        self.refresh_table()
+        self.journal.removed_before(before, count)
+        self.flush_journal()
 
-    def choose_save_location(self):
+    def choose_save_location(self, new=False):
         try:
-            file, _ = QFileDialog.getSaveFileName(self,"Select Location to Save CSV File", "untitled.csv","CSV Files (*.csv)")
+            file, _ = QFileDialog.getSaveFileName(self,"Select Location to Save the Events", "untitled.csv","CSV Files (*.csv);;SQLite Databases (*.sqlite)")
             if file:
-                self.csv_file_path = file
-                self.file_path_display.setText(file)
+                if self.mapped_log is not None:
+                    # Continue on an editable copy of the read-only log
+                    if is_sqlite(file):
+                        if os.path.exists(file):
+                            os.remove(file)  # Overwriting was confirmed in the dialog
+                        migrate(self.csv_file_path, file)
+                    else:
+                        shutil.copyfile(self.csv_file_path, file)
+                    self.start_loading(file)
+                    return
+                if new or self.active_log is None:
+                    if self.workspace.get(file) is not None:
+                        raise ValueError(f"{file} is already open in another tab")
+                    if not self.open_tab(OpenLog(file)):
+                        return
+                self.set_csv_file_path(file)
                 
                 # Write the current events to the new file
-                with open(file, mode="w", newline="") as csv_file:
-                    writer = csv.writer(csv_file)
-                    for row in range(self.table.rowCount()):
-                        row_data = []
-                        for column in range(self.table.columnCount()):
-                            item = self.table.item(row, column)
-                            if item is not None:
-                                row_data.append(item.text())
-                            else:
-                                row_data.append('')
-                        writer.writerow(row_data)
-                
-                # Load the events from the new file
-                self.table.setRowCount(0) 
-                try:
-                    self.table.itemChanged.disconnect(self.update_table)  # Disconnect the signal
-                except TypeError:
-                    pass  # Signal was not connected
-                with open(file, mode="r", newline="") as csv_file:
-                    reader = csv.reader(csv_file)
-                    for row in reader:
-                        row_num = self.table.rowCount()
-                        self.table.insertRow(row_num)
-                        for col_num, data in enumerate(row):
-                            self.table.setItem(row_num, col_num, QTableWidgetItem(str(data)))
-                self.update_table()
-                self.table.itemChanged.connect(self.update_table)  # Reconnect the signal
+                self.write_table_to_csv()
+                self.refresh_table()
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Error saving file: {e}")
-            self.choose_file()
+            if self.csv_file_path == '':
+                self.choose_file()
     
     def load_csv(self):
         try:
-            file, _ = QFileDialog.getOpenFileName(self,"Select CSV File to Open", "","CSV Files (*.csv);;All Files (*)")
+            file, _ = QFileDialog.getOpenFileName(self,"Select Event Log to Open", "",LOG_FILTERS)
             if file:
-                self.csv_file_path = file
-                self.table.setRowCount(0)  # Clear the table
-                try:
-                    self.table.itemChanged.disconnect(self.update_table)  # Disconnect the signal
-                except TypeError:
-                    pass  # Signal was not connected
-                with open(file, mode="r", newline="") as csv_file:
-                    reader = csv.reader(csv_file)
-                    for row in reader:
-                        if len(row) != 3:
-                            raise ValueError("Each row in the CSV file must have exactly 3 columns")
-                        row_num = self.table.rowCount()
-                        self.table.insertRow(row_num)
-                        for col_num, data in enumerate(row):
-                            self.table.setItem(row_num, col_num, QTableWidgetItem(str(data)))
-                self.file_path_display.setText(file)
-                self.update_table()
-                self.table.itemChanged.connect(self.update_table)  # Reconnect the signal
+                self.start_loading(file)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Error loading file, not a valid CSV: {e}")
-            self.choose_file()
+            if self.csv_file_path == '':
+                self.choose_file()
+
+    def start_loading(self, file):
+        index = self.find_tab(file)
+        if index >= 0:
+            self.tabs.setCurrentIndex(index)  # Already open
+            return
+        # Nothing is written to the file until it has been fully loaded
+        if not self.open_tab(OpenLog(file)):
+            return
+        self.clear_filter()
+        self.load_errors = []
+        self.load_in_order = True
+        self.load_started = time.perf_counter()
+
+        self.loader = LogLoader(file)
+        self.loader_thread = QThread(self)
+        self.loader.moveToThread(self.loader_thread)
+        self.loader_thread.started.connect(self.loader.run)
+        self.loader.batch_loaded.connect(self.add_loaded_batch)
+        self.loader.finished.connect(self.finish_loading)
+        self.loader.failed.connect(self.fail_loading)
+        self.set_loading(True)
+        self.loader_thread.start()
+
+    def set_loading(self, loading):
+        self.load_progress.setValue(0)
+        self.load_progress.setVisible(loading)
+        self.cancel_load_button.setVisible(loading)
+        for widget in (self.save_button, self.load_button, self.record_button, self.delete_button, self.report_button,
+                       self.search_entry, self.from_entry, self.to_entry, self.tabs, self.new_button, self.read_only_button,
+                       self.delete_before_button, self.archive_button):
+            widget.setEnabled(not loading)
+        if loading:
+            self.table.setEditTriggers(QTableView.EditTrigger.NoEditTriggers)
+        else:
+            self.table.setEditTriggers(self.edit_triggers)
+
+    def set_history_loading(self, loading):
+        # The log can be worked on while its older events are read, but not
+        # saved elsewhere, reported on or pruned, which need all of it
+        self.load_progress.setValue(0)
+        self.load_progress.setVisible(loading)
+        for widget in (self.save_button, self.load_button, self.report_button, self.tabs, self.new_button,
+                       self.read_only_button, self.delete_before_button, self.archive_button):
+            widget.setEnabled(not loading)
+
+    def stop_loader(self):
+        # The worker notices the cancellation after the batch it is parsing
+        self.loader.cancel()
+        self.loader_thread.quit()
+        self.loader_thread.wait()
+        self.loader_thread.deleteLater()
+        self.loader = None
+        self.set_loading(False)
+
+    def stop_history(self):
+        self.history_loader.cancel()
+        self.history_thread.quit()
+        self.history_thread.wait()
+        self.history_thread.deleteLater()
+        self.history_loader = None
+        self.set_history_loading(False)
+
+    @timed
+    def add_loaded_batch(self, loader, stamps, events, errors, percent):
+        if loader is self.history_loader:
+            # Older events go above the ones on screen, which stay in view
+            top = self.table.rowAt(0)
+            self.model.prepend(stamps, events)
+            if top >= 0 and self.model.visible is None:
+                self.table.updateGeometries()  # The scroll range, which is otherwise updated later
+                self.table.scrollTo(self.model.index(top + len(stamps), 0), QTableView.ScrollHint.PositionAtTop)
+            self.load_progress.setValue(percent)
+            return
+        if loader is not self.loader:
+            return  # Left over from a cancelled load
+        if not self.model.extend(stamps, events):
+            self.load_in_order = False
+        self.load_errors.extend(errors)
+        self.load_progress.setValue(percent)
+        self.refresh_table()
+        if loader.newest_first:
+            # The most recent events are in: the log is ready, and the worker
+            # goes on with the older ones
+            self.history_loader, self.history_thread = loader, self.loader_thread
+            self.loader = None
+            self.set_loading(False)
+            self.set_history_loading(True)
+            self.table.scrollToBottom()
+            self.use_loaded_log()
+
+    @timed
+    def finish_loading(self, loader):
+        if loader is self.history_loader:
+            self.stop_history()
+            log.info("Loaded %d events from %s in %.2f s", len(self.store), self.csv_file_path, time.perf_counter() - self.load_started)
+            return
+        if loader is not self.loader:
+            return
+        self.stop_loader()
+        if self.load_errors:
+            lines = "\n".join(f"Line {line}: {message}" for line, message in self.load_errors[:20])
+            if len(self.load_errors) > 20:
+                lines += f"\n... and {len(self.load_errors) - 20} more"
+            answer = QMessageBox.question(self, "Malformed Lines",
+                f"{len(self.load_errors)} malformed lines were skipped:\n\n{lines}\n\n"
+                "They will be removed from the file the next time it is saved. Keep working on this file?")
+            if answer != QMessageBox.StandardButton.Yes:
+                self.abort_loading()
+                return
+        log.info("Loaded %d events from %s in %.2f s", len(self.store), self.csv_file_path, time.perf_counter() - self.load_started)
+        self.use_loaded_log()
+
+    def use_loaded_log(self):
+        self.journal = open_journal(self.csv_file_path)
+        self.refresh_table()
+        if not self.load_in_order:
+            self.journal.mark_dirty(len(self.store))  # Save the file sorted
+            self.schedule_flush()
+        self.record_received(array('q'), [])
+
+    def fail_loading(self, loader, message):
+        if loader is self.history_loader:
+            # Part of the log is missing, it can't stay open
+            self.stop_history()
+            QMessageBox.critical(self, "Error", f"Error reading the older events: {message}")
+            self.abort_loading()
+            return
+        if loader is not self.loader:
+            return
+        self.stop_loader()
+        QMessageBox.critical(self, "Error", f"Error loading file, not a valid CSV: {message}")
+        self.abort_loading()
+
+    def cancel_loading(self):
+        if self.loader is not None:
+            self.stop_loader()
+            self.abort_loading()
+
+    def abort_loading(self):
+        self.close_tab(self.tabs.currentIndex())
+
+    def open_read_only(self):
+        try:
+            file, _ = QFileDialog.getOpenFileName(self,"Select CSV File to Browse", "","CSV Files (*.csv);;All Files (*)")
+            if not file:
+                return
+            index = self.find_tab(file)
+            if index >= 0:
+                self.tabs.setCurrentIndex(index)  # Already open
+                return
+            if is_sqlite(file):
+                QMessageBox.information(self, "Read-Only", "Read-only mode is for large CSV files, SQLite logs open quickly with 'Load Existing'.")
+                return
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Error opening file: {e}")
+            if self.csv_file_path == '':
+                self.choose_file()
+            return
+
+        # The tab stays empty until the index is built
+        if not self.open_tab(OpenLog(file)):
+            return
+        self.clear_filter()
+        self.loader = IndexLoader(file)
+        self.loader_thread = QThread(self)
+        self.loader.moveToThread(self.loader_thread)
+        self.loader_thread.started.connect(self.loader.run)
+        self.loader.progress.connect(self.show_index_progress)
+        self.loader.indexed.connect(self.finish_read_only)
+        self.loader.failed.connect(self.fail_loading)
+        self.set_loading(True)
+        self.loader_thread.start()
+
+    def show_index_progress(self, loader, percent):
+        if loader is self.loader:
+            self.load_progress.setValue(percent)
+
+    def finish_read_only(self, loader, mapped_log):
+        if loader is not self.loader:
+            mapped_log.close()  # Left over from a cancelled load
+            return
+        self.stop_loader()
+        self.active_log.mapped_log = mapped_log
+        self.show_log(self.active_log)
+
+    def set_read_only(self, read_only):
+        for widget in (self.record_button, self.delete_button, self.event_entry, self.report_button,
+                       self.search_entry, self.from_entry, self.to_entry, self.delete_before_button, self.archive_button):
+            widget.setEnabled(not read_only)
+
+    def closeEvent(self, event):
+        if not self.flush_journal():
+            answer = QMessageBox.question(self, "Unsaved Changes", "The last changes couldn't be saved. Quit anyway?",
+                                          QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+            if answer != QMessageBox.StandardButton.Yes:
+                event.ignore()
+                return
+            self.journal.dirty = 0  # Given up on
+        self.park_log()
+        self.workspace.close()
+        self.journal = None
+        self.mapped_log = None
+        if self.server is not None:
+            self.toggle_server(False)
+        if self.loader is not None:
+            self.stop_loader()
+        if self.history_loader is not None:
+            self.stop_history()
+        super().closeEvent(event)
         
     #Custom buttons
-    def load_config(self, config_file_path):
+    def config_changed(self, config_file_path):
+        if os.path.exists(config_file_path) and config_file_path not in self.config_watcher.files():
+            self.config_watcher.addPath(config_file_path)
+        if config_stat(config_file_path) == self.config_stat:
+            return
+        # Wait for the editor to finish writing
+        self.config_timer.start(100)
+
+    def load_config(self, config_file_path, quiet=False):
+        self.config_stat = config_stat(config_file_path)
         try:
             config = configparser.ConfigParser()
             config.read(config_file_path)
-            
-            # Remove all buttons from the grid layout
-            for i in reversed(range(self.button2_grid.count())):
-                widget_to_remove = self.button2_grid.itemAt(i).widget()
-                self.button2_grid.removeWidget(widget_to_remove)
-                widget_to_remove.setParent(None)
-            
-            # Add the buttons from the config file
-            for index, (button_name, button_text) in enumerate(config['BUTTONS'].items()):
-                # Limit the displayed text to 25 characters
-                displayed_text = button_text[:25] + '...' if len(button_text) > 25 else button_text
-                button = QPushButton(displayed_text)
-                button.clicked.connect(lambda checked, button_text=button_text: self.record_event(button_text, button, self.update_clock(True)))
-                row = index // 3  # Integer division to get the row number
-                col = index % 3  # Remainder to get the column number
-                self.button2_grid.addWidget(button, row, col)
-                
+            buttons = list(config['BUTTONS'].items())
         except Exception as e:
+            if quiet:
+                log.warning("Not reloading the malformed config file: %s", e)
+                return
             QMessageBox.critical(self, "Error", f"Malformed config file: {e} \n\nPlease check the config file by clicking the 'Open Config File' button.\n\nThe structure should be the following:\n\n[BUTTONS]\nButton1=text1\nButton2=text2\n...")
+            return
+
+        # Only the buttons that changed are touched, the others keep their
+        # focus and state
+        names = {name for name, _ in buttons}
+        for name in list(self.quick_buttons):
+            if name not in names:
+                button, _ = self.quick_buttons.pop(name)
+                self.button2_grid.removeWidget(button)
+                button.deleteLater()
+
+        for index, (button_name, button_text) in enumerate(buttons):
+            # Limit the displayed text to 25 characters
+            displayed_text = button_text[:25] + '...' if len(button_text) > 25 else button_text
+            if button_name in self.quick_buttons:
+                button, old_text = self.quick_buttons[button_name]
+                if button_text != old_text:
+                    button.setText(displayed_text)
+            else:
+                button = QPushButton(displayed_text)
+                button.clicked.connect(lambda checked, button_name=button_name: self.record_quick_event(button_name))
+            self.quick_buttons[button_name] = (button, button_text)
+
+            row = index // 3  # Integer division to get the row number
+            col = index % 3  # Remainder to get the column number
+            item = self.button2_grid.itemAtPosition(row, col)
+            if item is None or item.widget() is not button:
+                self.button2_grid.removeWidget(button)
+                self.button2_grid.addWidget(button, row, col)
+
+    def record_quick_event(self, button_name):
+        button, button_text = self.quick_buttons[button_name]
+        self.record_event(button_text, button, self.update_clock(True))
     
                     
     def choose_file(self):
@@ -421,15 +1458,17 @@ class EventRecorder(QWidget):
             # If "Load Existing" was clicked in the dialog
             elif dialog.clicked_button == 'load':
                 self.load_csv()
+            elif dialog.clicked_button == 'read_only':
+                self.open_read_only()
         elif result == QDialog.DialogCode.Rejected:
             sys.exit()
 
         if self.csv_file_path == '':
             self.choose_file()
         
-    def copy_to_entry(self, item):
-        if item is not None:
-            self.event_entry.setPlainText(item.text())
+    def copy_to_entry(self, index):
+        if index.isValid():
+            self.event_entry.setPlainText(index.data())
         else:
             self.event_entry.setPlainText("")
         
@@ -455,12 +1494,13 @@ class EventRecorder(QWidget):
             
 
 def main():
+    setup_logging()
     app = QApplication(sys.argv)
     
     window = EventRecorder()
     window.show()
 
-    sys.exit(app.exec())
+    sys.exit(run_profiled(app.exec))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+
+# Command line interface to the event logs, for scripts and automation.
+# It only uses the pure Python modules, so it never loads Qt.
+
+import argparse
+import csv
+import os
+import socket
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime
+
+from event_index import EventIndex, parse_bound
+from event_store import EventStore, datetime_stamp, format_date, format_time, read_csv_batches
+from storage import add_events, migrate, open_journal, read_store
+
+COMMANDS = ("record", "import", "export", "stats", "send", "migrate")
+
+
+def server_address():
+    # Where a running EventRecorder listens for events from other programs:
+    # a named pipe on Windows, a Unix domain socket elsewhere
+    if os.name == 'nt':
+        return 'EventRecorder'
+    return os.path.join(os.getenv('XDG_RUNTIME_DIR') or tempfile.gettempdir(), 'EventRecorder.sock')
+
+
+def warn(message):
+    print(f"EventRecorder: {message}", file=sys.stderr)
+
+
+def warn_errors(path, errors):
+    for line, message in errors:
+        warn(f"{path}:{line}: skipped, {message}")
+
+
+def load(path, start=None, end=None):
+    # Only the events between the start and end stamps, which is all a
+    # SQLite log reads
+    journal = open_journal(path)
+    try:
+        store, errors = journal.read_range(start, end)
+    finally:
+        journal.close()
+    warn_errors(path, errors)
+    return store
+
+
+def bounds(args):
+    return parse_bound(args.start or ""), parse_bound(args.end or "", end=True)
+
+
+def parse_at(text):
+    try:
+        return datetime_stamp(datetime.strptime(text.strip(), "%Y-%m-%d %H:%M:%S"))
+    except ValueError:
+        raise ValueError(f"Invalid time for --at: '{text}', expected 'YYYY-MM-DD HH:MM:SS'") from None
+
+
+def cmd_record(args):
+    at = parse_at(args.at) if args.at else None
+    texts = args.events or (line.strip() for line in sys.stdin)
+    incoming = EventStore()
+    for text in texts:
+        if text:
+            incoming.insert(at if at is not None else datetime_stamp(datetime.now()), text)
+    if len(incoming):
+        add_events(args.file, incoming)
+    return 0
+
+
+def cmd_import(args):
+    incoming = EventStore()
+    for source in args.sources:
+        if source == "-":
+            for stamps, events, errors, _ in read_csv_batches(sys.stdin.buffer):
+                incoming.extend(stamps, events)
+                warn_errors(source, errors)
+        else:
+            store, errors = read_store(source)
+            incoming.extend(store.stamps, store.events)
+            warn_errors(source, errors)
+    if len(incoming):
+        add_events(args.file, incoming)
+    print(f"Imported {len(incoming)} events")
+    return 0
+
+
+def cmd_export(args):
+    start, end = bounds(args)
+    store = load(args.file, start, end)
+    rows = EventIndex(store).search(args.search or "", start, end)
+    output = sys.stdout if args.output == "-" else open(args.output, mode="w", newline="")
+    try:
+        writer = csv.writer(output)
+        for position in rows:
+            writer.writerow(store.row(position))
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 0
+
+
+def cmd_stats(args):
+    # Imported here, the report module pulls in NumPy when it's available
+    from report import build_report, format_duration, write_report
+
+    start, end = bounds(args)
+    store = load(args.file, start, end)
+    report = build_report(store.stamps, store.events, start, end, args.max_gap * 60 if args.max_gap else None)
+    if args.output:
+        write_report(report, args.output)
+        return 0
+
+    print(f"{len(store)} events", end="")
+    if len(store):
+        print(f", from {format_date(store.stamps[0])} {format_time(store.stamps[0])}"
+              f" to {format_date(store.stamps[-1])} {format_time(store.stamps[-1])}", end="")
+    print()
+    for label, seconds in report["labels"].items():
+        print(f"{format_duration(seconds):>12}  {label}")
+    return 0
+
+
+def cmd_send(args):
+    # Lines from stdin are sent as they come, so that the window timestamps
+    # them when they happen
+    texts = args.events or (line.strip() for line in sys.stdin)
+    if os.name == 'nt':
+        with open('\\\\.\\pipe\\' + server_address(), mode="wb", buffering=0) as pipe:
+            for text in texts:
+                if text:
+                    pipe.write(f"{text}\n".encode("utf-8"))
+    else:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.connect(server_address())
+            for text in texts:
+                if text:
+                    connection.sendall(f"{text}\n".encode("utf-8"))
+    return 0
+
+
+def cmd_migrate(args):
+    count = migrate(args.source, args.target)
+    print(f"Migrated {count} events to {args.target}")
+    return 0
+
+
+def parser():
+    parser = argparse.ArgumentParser(prog="EventRecorder", description="Record and inspect event logs without opening the window.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record = commands.add_parser("record", help="record events with the current time")
+    record.add_argument("file", help="event log, .csv or .sqlite")
+    record.add_argument("events", nargs="*", help="events to record, one per line from stdin if none are given")
+    record.add_argument("--at", help="record at this time instead, as 'YYYY-MM-DD HH:MM:SS'")
+    record.set_defaults(run=cmd_record)
+
+    send = commands.add_parser("send", help="send events to the running EventRecorder window")
+    send.add_argument("events", nargs="*", help="events to send, one per line from stdin if none are given")
+    send.set_defaults(run=cmd_send)
+
+    import_ = commands.add_parser("import", help="add the events of other logs")
+    import_.add_argument("file", help="event log, .csv or .sqlite")
+    import_.add_argument("sources", nargs="+", help="logs to import, - for CSV with Date,Time,Event rows on stdin")
+    import_.set_defaults(run=cmd_import)
+
+    migrate_ = commands.add_parser("migrate", help="copy a log to a new file in another format, e.g. CSV to SQLite")
+    migrate_.add_argument("source", help="event log to copy")
+    migrate_.add_argument("target", help="new log, a SQLite database if it ends with .sqlite, .sqlite3 or .db, CSV otherwise")
+    migrate_.set_defaults(run=cmd_migrate)
+
+    for name, help, run in (("export", "write events as CSV", cmd_export),
+                            ("stats", "show the time spent on each event", cmd_stats)):
+        command = commands.add_parser(name, help=help)
+        command.add_argument("file", help="event log, .csv or .sqlite")
+        command.add_argument("--from", dest="start", help="first date, as 'YYYY-MM-DD[ HH:MM[:SS]]'")
+        command.add_argument("--to", dest="end", help="last date, as 'YYYY-MM-DD[ HH:MM[:SS]]'")
+        command.set_defaults(run=run)
+        if name == "export":
+            command.add_argument("output", nargs="?", default="-", help="output CSV file, stdout by default")
+            command.add_argument("--search", help="only events containing this text")
+        else:
+            command.add_argument("--max-gap", type=int, help="ignore durations longer than this many minutes")
+            command.add_argument("--output", help="save the full report (per day and per week) as .csv or .json")
+    for command in commands.choices.values():
+        command.set_defaults(parser=command)
+    return parser
+
+
+def parse_args(argv=None):
+    # Options may also come between the events, as in 'record FILE EVENT
+    # --at TIME EVENT', which only the command's own parser can take apart
+    argv = sys.argv[1:] if argv is None else argv
+    args, rest = parser().parse_known_args(argv)
+    if rest:
+        args = args.parser.parse_intermixed_args(argv[1:], argparse.Namespace(command=args.command))
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        return args.run(args)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        warn(str(e))
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
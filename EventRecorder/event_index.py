@@ -0,0 +1,166 @@
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from itertools import chain, compress
+import re
+
+from event_store import pack_stamp
+
+TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return TOKEN.findall(text.lower())
+
+
+def parse_bound(text, end=False):
+    # "YYYY-MM-DD" or "YYYY-MM-DD HH:MM[:SS]" -> stamp, None when empty. A
+    # bare date covers the whole day.
+    text = text.strip()
+    if not text:
+        return None
+    date, _, time = text.partition(" ")
+    time = time.strip()
+    if not time:
+        time = "23:59:59" if end else "00:00:00"
+    elif time.count(":") == 1:
+        time += ":59" if end else ":00"
+    return pack_stamp(date, time)
+
+
+class EventIndex:
+    """Search index over the rows of an EventStore.
+
+    Every distinct event text keeps the sorted list of rows it appears in,
+    and every word maps to the distinct texts containing it, so a search only
+    looks at the vocabulary and the matching rows. Date ranges come for free
+    from the store being sorted by timestamp.
+
+    The store keeps the index up to date: appending events or deleting the
+    last rows of the log is incremental, anything that shifts rows around
+    only marks the row lists stale. The words, which don't depend on the
+    rows, stay. A search on stale row lists goes through the events once
+    instead of rebuilding them; rebuild() is for when the rows have settled.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.valid = False
+        self.postings = {}
+        self.tokens = {}
+        self.texts = set()  # Every text in the words, and maybe a few gone since
+        self.learn(set(store.events))
+
+    def invalidate(self, new_texts=()):
+        self.valid = False
+        self.postings = {}
+        self.learn(set(new_texts))
+
+    def learn(self, texts):
+        for text in texts - self.texts:
+            self.texts.add(text)
+            for token in tokenize(text):
+                self.tokens.setdefault(token, set()).add(text)
+
+    def forget(self, text):
+        self.texts.discard(text)
+        for token in tokenize(text):
+            texts = self.tokens[token]
+            texts.discard(text)
+            if not texts:
+                del self.tokens[token]
+
+    def rebuild(self):
+        self.postings = postings = {}
+        for position, text in enumerate(self.store.events):
+            posting = postings.get(text)
+            if posting is None:
+                posting = postings[text] = array('q')
+            posting.append(position)
+        self.learn(postings.keys())
+        for text in self.texts - postings.keys():
+            self.forget(text)
+        self.valid = True
+
+    def posting(self, text):
+        posting = self.postings.get(text)
+        if posting is None:
+            posting = self.postings[text] = array('q')
+            self.learn({text})
+        return posting
+
+    def drop_row(self, position, text):
+        posting = self.postings[text]
+        del posting[bisect_left(posting, position)]
+        if not posting:
+            del self.postings[text]
+            self.forget(text)
+
+    def inserted(self, position, text):
+        if self.valid and position == len(self.store.events) - 1:
+            self.posting(text).append(position)
+        else:
+            self.invalidate((text,))
+
+    def removed(self, position, texts):
+        # The rows from `position` on, with these texts, were removed
+        if not self.valid:
+            return
+        if position == len(self.store.events):  # Were the last rows
+            for offset in range(len(texts) - 1, -1, -1):
+                self.drop_row(position + offset, texts[offset])
+        else:
+            self.invalidate()
+
+    def changed(self, position, old_text, new_text):
+        if old_text == new_text:
+            return
+        if self.valid:
+            self.drop_row(position, old_text)
+            insort(self.posting(new_text), position)
+        else:
+            self.learn({new_text})
+
+    def matching_texts(self, needle):
+        # Narrow the distinct texts down through the word index, then check
+        # the actual substring on what's left
+        texts = None
+        for word in tokenize(needle):
+            found = set()
+            for token, token_texts in self.tokens.items():
+                if word in token:
+                    found |= token_texts
+            texts = found if texts is None else texts & found
+            if not texts:
+                return []
+        if texts is None:
+            texts = self.texts
+        if tokenize(needle) == [needle]:
+            return list(texts)  # A single word, found in a word of each text
+        return [text for text in texts if needle in text.lower()]
+
+    def search(self, text="", start=None, end=None):
+        """Rows whose event contains `text`, between the `start` and `end`
+        stamps (both inclusive, None for no limit)."""
+        stamps = self.store.stamps
+        first = 0 if start is None else bisect_left(stamps, start)
+        last = len(stamps) if end is None else bisect_right(stamps, end)
+        needle = text.strip().lower()
+        if not needle:
+            return range(first, last)
+
+        texts = self.matching_texts(needle)
+        if not texts:
+            return []
+        if len(texts) == len(self.texts):
+            return range(first, last)  # Every event matches
+        if not self.valid:
+            matched = set(texts)
+            return array('q', compress(range(first, last), map(matched.__contains__, self.store.events[first:last])))
+        postings = [self.postings[match] for match in texts if match in self.postings]
+        if first > 0 or last < len(stamps):
+            postings = [posting[bisect_left(posting, first):bisect_left(posting, last)] for posting in postings]
+        if len(postings) == 1:
+            return postings[0][:]  # A copy, the index keeps changing its own
+        # Sorting the concatenated lists merges them in C, quicker than
+        # heapq.merge or going through all the rows
+        return sorted(chain.from_iterable(postings))
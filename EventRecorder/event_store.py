@@ -0,0 +1,277 @@
+from array import array
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import islice
+import csv
+import datetime
+import locale
+import operator
+import sys
+
+
+@lru_cache(maxsize=4096)
+def pack_date(date):
+    # "YYYY-MM-DD" -> YYYYMMDD000000 if it's a real day of the calendar.
+    # Cached, most events share their date with many others.
+    year, month, day = (int(part) for part in date.split("-"))
+    datetime.date(year, month, day)  # ValueError for February 30 and the like
+    return ((year * 100 + month) * 100 + day) * 1000000
+
+
+def pack_stamp(date, time):
+    # "YYYY-MM-DD", "HH:MM:SS" -> YYYYMMDDHHMMSS, which sorts like the strings do
+    try:
+        day = pack_date(date)
+        hour, minute, second = (int(part) for part in time.split(":"))
+    except ValueError:
+        raise ValueError(f"Invalid date or time: '{date}, {time}'") from None
+    if not (0 <= hour < 24 and 0 <= minute < 60 and 0 <= second < 60):
+        raise ValueError(f"Invalid date or time: '{date}, {time}'")
+    return day + (hour * 100 + minute) * 100 + second
+
+
+def pack_time(time):
+    # "HH:MM:SS" -> HHMMSS, None when it isn't a valid time in exactly that
+    # format. Quicker than pack_stamp() for the common case.
+    if len(time) == 8 and time[2] == time[5] == ":":
+        digits = time[:2] + time[3:5] + time[6:]
+        if digits.isascii() and digits.isdigit():
+            hms = int(digits)
+            if hms < 240000 and hms // 100 % 100 < 60 and hms % 100 < 60:
+                return hms
+    return None
+
+
+def datetime_stamp(moment):
+    return int(moment.strftime("%Y%m%d%H%M%S"))
+
+
+def format_date(stamp):
+    date = stamp // 1000000
+    return "%04d-%02d-%02d" % (date // 10000, date // 100 % 100, date % 100)
+
+
+def format_time(stamp):
+    time = stamp % 1000000
+    return "%02d:%02d:%02d" % (time // 10000, time // 100 % 100, time % 100)
+
+
+def parse_row(row):
+    if len(row) != 3:
+        raise ValueError("Each row in the CSV file must have exactly 3 columns")
+    return pack_stamp(row[0], row[1]), row[2]
+
+
+def to_ranges(positions):
+    # Sorted positions -> (start, stop) ranges of consecutive ones
+    ranges = []
+    for position in positions:
+        if ranges and ranges[-1][1] == position:
+            ranges[-1][1] += 1
+        else:
+            ranges.append([position, position + 1])
+    return ranges
+
+
+def read_csv_batches(file, first_batch=500, batch_size=20000):
+    """Parses an event CSV file opened in binary mode, one batch at a time.
+
+    Yields (stamps, events, errors, position) tuples, where errors is a list
+    of (line number, message) for the malformed lines of the batch and
+    position is how many bytes of the file have been read so far. The first
+    batch is kept small so that it can be shown right away.
+    """
+    encoding = locale.getpreferredencoding(False)
+    position = 0
+
+    def lines():
+        nonlocal position
+        for line in file:
+            position += len(line)
+            yield line.decode(encoding)
+
+    # Most rows share their date with the previous ones, so dates are only
+    # parsed once
+    days = {}
+
+    def parse(row):
+        if len(row) == 3:
+            day, time = days.get(row[0]), pack_time(row[1])
+            if day is not None and time is not None:
+                return day + time, row[2]
+        stamp, event = parse_row(row)
+        days[row[0]] = stamp - stamp % 1000000
+        return stamp, event
+
+    reader = csv.reader(lines())
+    stamps, events, errors = array('q'), [], []
+    size = first_batch
+    for row in reader:
+        if not row:
+            continue  # Blank line
+        try:
+            stamp, event = parse(row)
+        except ValueError as e:
+            errors.append((reader.line_num, str(e)))
+            continue
+        stamps.append(stamp)
+        events.append(sys.intern(event))
+        if len(stamps) >= size:
+            yield stamps, events, errors, position
+            stamps, events, errors = array('q'), [], []
+            size = batch_size
+    yield stamps, events, errors, position
+
+
+class EventStore:
+    """Columnar storage for the event log.
+
+    Dates and times are packed together into one 64-bit integer per event and
+    event texts are interned, so repeated events share a single string.
+    Rows are always kept sorted by timestamp: new events are placed with a
+    binary search, which in the usual case ends up at the end of the arrays.
+    An EventIndex can be attached to `index` and is kept up to date.
+    """
+
+    def __init__(self):
+        self.stamps = array('q')
+        self.events = []
+        self.index = None
+
+    def __len__(self):
+        return len(self.stamps)
+
+    def row(self, index):
+        stamp = self.stamps[index]
+        return [format_date(stamp), format_time(stamp), self.events[index]]
+
+    def cell(self, index, column):
+        if column == 0:
+            return format_date(self.stamps[index])
+        if column == 1:
+            return format_time(self.stamps[index])
+        return self.events[index]
+
+    def rows(self):
+        for stamp, event in zip(self.stamps, self.events):
+            yield [format_date(stamp), format_time(stamp), event]
+
+    def insertion_point(self, stamp, moving=None):
+        # Position a row with this stamp would take, after removing the row
+        # at index `moving` if one is being moved
+        position = bisect_right(self.stamps, stamp)
+        if moving is not None and moving < position:
+            position -= 1
+        return position
+
+    def insert(self, stamp, event):
+        position = self.insertion_point(stamp)
+        if position == len(self.stamps):
+            self.stamps.append(stamp)
+            self.events.append(sys.intern(event))
+        else:
+            self.stamps.insert(position, stamp)
+            self.events.insert(position, sys.intern(event))
+        if self.index is not None:
+            self.index.inserted(position, self.events[position])
+        return position
+
+    def is_in_order(self, stamps):
+        # Whether these stamps can be appended without breaking the order
+        if not stamps:
+            return True
+        if self.stamps and stamps[0] < self.stamps[-1]:
+            return False
+        return all(map(operator.le, stamps, islice(stamps, 1, None)))
+
+    def extend(self, stamps, events):
+        in_order = self.is_in_order(stamps)
+        if in_order:
+            self.stamps.extend(stamps)
+            self.events.extend(events)
+        else:
+            self.merge(stamps, events)
+        if self.index is not None:
+            self.index.invalidate(events)
+        return in_order
+
+    def prepend(self, stamps, events):
+        # Rows older than all the others, read back newest first
+        self.stamps = stamps + self.stamps
+        self.events = events + self.events
+        if self.index is not None:
+            self.index.invalidate(events)
+
+    def merge(self, stamps, events):
+        # Adds rows in any order: only the new rows are sorted, then they are
+        # spliced in between slices of the store, so a few late events cost
+        # one copy of the arrays instead of sorting the whole log again
+        order = sorted(range(len(stamps)), key=stamps.__getitem__)
+        merged_stamps, merged_events = array('q'), []
+        start = 0
+        for i in order:
+            position = bisect_right(self.stamps, stamps[i], start)
+            merged_stamps += self.stamps[start:position]
+            merged_events += self.events[start:position]
+            merged_stamps.append(stamps[i])
+            merged_events.append(events[i])
+            start = position
+        merged_stamps += self.stamps[start:]
+        merged_events += self.events[start:]
+        self.stamps, self.events = merged_stamps, merged_events
+        if self.index is not None:
+            self.index.invalidate(events)
+
+    def clear(self):
+        self.stamps = array('q')
+        self.events = []
+        if self.index is not None:
+            self.index.invalidate()
+
+    def set_stamp(self, index, stamp):
+        # Moves the row to keep the order, returns its new position
+        position = self.insertion_point(stamp, moving=index)
+        if position == index:
+            self.stamps[index] = stamp
+        else:
+            event = self.events[index]
+            del self.stamps[index]
+            del self.events[index]
+            self.stamps.insert(position, stamp)
+            self.events.insert(position, event)
+            if self.index is not None:
+                self.index.invalidate()
+        return position
+
+    def set_event(self, index, event):
+        old_event = self.events[index]
+        self.events[index] = sys.intern(event)
+        if self.index is not None:
+            self.index.changed(index, old_event, self.events[index])
+
+    def remove_ranges(self, ranges):
+        # Removes the rows of sorted, non-overlapping (start, stop) ranges
+        # with a single copy of what's kept, however many ranges there are
+        if len(ranges) == 1:
+            start, stop = ranges[0]
+            if self.index is not None and stop == len(self.stamps):
+                # Nothing moves when the last rows go, the index keeps up
+                events = self.events[start:stop]
+                del self.stamps[start:stop]
+                del self.events[start:stop]
+                self.index.removed(start, events)
+                return
+            del self.stamps[start:stop]
+            del self.events[start:stop]
+        else:
+            stamps, events = array('q'), []
+            kept = 0
+            for start, stop in ranges:
+                stamps += self.stamps[kept:start]
+                events += self.events[kept:start]
+                kept = stop
+            stamps += self.stamps[kept:]
+            events += self.events[kept:]
+            self.stamps, self.events = stamps, events
+        if self.index is not None:
+            self.index.invalidate()
@@ -0,0 +1,105 @@
+import atexit
+import functools
+import inspect
+import logging
+import os
+import sys
+import time
+
+log = logging.getLogger("EventRecorder")
+
+# EVENTRECORDER_PROFILE=1 times the methods marked with @timed and prints a
+# summary on exit. Set it to a file name ending in .prof to also run the
+# whole application under cProfile and save the stats there.
+PROFILE = os.environ.get("EVENTRECORDER_PROFILE", "")
+spans = {}  # Method -> [calls, total seconds, longest call]
+
+
+def timed(function):
+    # Returns the method untouched unless profiling
+    if not PROFILE:
+        return function
+    name = function.__qualname__
+    # PyQt drops the signal arguments a slot doesn't take, which it can't
+    # see through the wrapper, so it's done here
+    code = function.__code__
+    accepted = None if code.co_flags & inspect.CO_VARARGS else code.co_argcount
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args[:accepted], **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            span = spans.setdefault(name, [0, 0.0, 0.0])
+            span[0] += 1
+            span[1] += elapsed
+            span[2] = max(span[2], elapsed)
+            log.debug("%s took %.1f ms", name, elapsed * 1000)
+
+    return wrapper
+
+
+def report_spans(file=None):
+    file = file or sys.stderr
+    if not spans:
+        return
+    file.write("%-36s  %8s  %12s  %12s  %12s\n" % ("method", "calls", "total (ms)", "mean (ms)", "max (ms)"))
+    for name, (calls, total, longest) in sorted(spans.items(), key=lambda item: -item[1][1]):
+        file.write("%-36s  %8d  %12.1f  %12.3f  %12.1f\n" % (name, calls, total * 1000, total / calls * 1000, longest * 1000))
+
+
+def run_profiled(function):
+    # Runs function(), under cProfile when EVENTRECORDER_PROFILE names a
+    # .prof file, and returns its result
+    if not PROFILE.endswith(".prof"):
+        return function()
+    import cProfile
+
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(function)
+    finally:
+        profiler.dump_stats(PROFILE)
+        log.warning("Profile saved to %s, open it with python -m pstats", PROFILE)
+
+
+class RateLimitFilter(logging.Filter):
+    """Lets the same message through at most once every `interval` seconds.
+
+    Messages are told apart by their format string, not their arguments, so
+    a burst of "wrote %d rows" lines only shows up once, followed by how many
+    were dropped the next time it gets through.
+    """
+
+    def __init__(self, interval=5.0):
+        super().__init__()
+        self.interval = interval
+        self.last = {}
+        self.dropped = {}
+
+    def filter(self, record):
+        key = (record.name, record.levelno, record.msg)
+        now = time.monotonic()
+        if now - self.last.get(key, -self.interval) < self.interval:
+            self.dropped[key] = self.dropped.get(key, 0) + 1
+            return False
+        self.last[key] = now
+        dropped = self.dropped.pop(key, 0)
+        if dropped:
+            record.msg = f"{record.msg} (and {dropped} more like it)"
+        return True
+
+
+def setup_logging():
+    # The level comes from EVENTRECORDER_LOG (DEBUG, INFO, WARNING...),
+    # warnings and errors only by default
+    level = os.environ.get("EVENTRECORDER_LOG", "WARNING").upper()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s", "%H:%M:%S"))
+    handler.addFilter(RateLimitFilter())
+    log.addHandler(handler)
+    log.setLevel(getattr(logging, level, logging.WARNING))
+    if PROFILE:
+        atexit.register(report_spans)
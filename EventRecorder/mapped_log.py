@@ -0,0 +1,168 @@
+from array import array
+from collections import OrderedDict
+import csv
+import io
+import locale
+import mmap
+import os
+import re
+import struct
+import tempfile
+
+INDEX_MAGIC = b"ERIDX1"
+INDEX_HEADER = struct.Struct("<6sqqqq")  # magic, file size, mtime, step, row count
+PROGRESS_ROWS = 1 << 16  # Rows indexed between progress reports
+
+
+class Cancelled(Exception):
+    pass
+
+
+def record_end(data, start, size, quoted):
+    # End of the CSV record starting at `start`, skipping newlines that are
+    # inside a quoted field
+    end = data.find(b"\n", start)
+    if end == -1:
+        return size
+    if quoted:
+        while data[start:end].count(b'"') % 2:
+            end = data.find(b"\n", end + 1)
+            if end == -1:
+                return size
+    return end + 1
+
+
+class MappedCsvLog:
+    """Read-only view of an event CSV file mapped into memory.
+
+    Instead of parsing the whole file, only the offset of every `step`-th row
+    is kept, and rows are decoded a block at a time when the view asks for
+    them. The index can be stored next to the file, keyed by the file size and
+    modification time, so reopening the same log is instant.
+
+    Building the index calls `progress` with the fraction of the file done;
+    if it returns False, the build stops and Cancelled is raised.
+    """
+
+    def __init__(self, path, step=64, cached_blocks=32, persist_index=True, progress=None):
+        self.path = path
+        self.encoding = locale.getpreferredencoding(False)
+        self.blocks = OrderedDict()
+        self.cached_blocks = cached_blocks
+        self.file = open(path, mode="rb")
+        stat = os.fstat(self.file.fileno())
+        self.size = stat.st_size
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+        self.quoted = self.data.find(b'"') != -1
+
+        index_path = path + ".idx"
+        if not self.read_index(index_path, stat, step):
+            try:
+                self.build_index(step, progress or (lambda done: True))
+            except BaseException:
+                self.close()
+                raise
+            if persist_index:
+                self.write_index(index_path, stat)
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self.blocks.clear()
+        if self.size:
+            self.data.close()
+        self.file.close()
+
+    def build_index(self, step, progress):
+        data = self.data
+        blank = data[:1] in (b"\r", b"\n") or data.find(b"\n\n") != -1 or data.find(b"\n\r") != -1
+        if self.quoted or blank:
+            self.offsets, self.count = self.scan_records(step, progress)
+        else:
+            self.offsets, self.count = self.scan_lines(step, progress)
+        self.step = step
+
+    def scan_lines(self, step, progress):
+        # Without quotes or blank lines every line is a row: a regular
+        # expression finds the end of every `step` lines in one pass
+        data, size = self.data, self.size
+        offsets = array('q', [0] if size else [])
+        end = 0
+        for number, match in enumerate(re.finditer(rb"(?:[^\n]*\n){%d}" % step, data), 1):
+            end = match.end()
+            if end < size:
+                offsets.append(end)
+            if number % (PROGRESS_ROWS // step) == 0 and not progress(end / size):
+                raise Cancelled
+        tail = data[end:size]
+        count = (len(offsets) - (1 if tail else 0)) * step + tail.count(b"\n") + (1 if tail and tail[-1:] != b"\n" else 0)
+        return offsets, count
+
+    def scan_records(self, step, progress):
+        data, size, quoted = self.data, self.size, self.quoted
+        offsets = array('q')
+        count = 0
+        position = 0
+        while position < size:
+            end = record_end(data, position, size, quoted)
+            if data[position] not in b"\r\n":  # Skip blank lines
+                if count % step == 0:
+                    offsets.append(position)
+                    if count % PROGRESS_ROWS == 0 and not progress(position / size):
+                        raise Cancelled
+                count += 1
+            position = end
+        return offsets, count
+
+    def read_index(self, index_path, stat, step):
+        try:
+            with open(index_path, mode="rb") as file:
+                magic, size, mtime, stored_step, count = INDEX_HEADER.unpack(file.read(INDEX_HEADER.size))
+                if (magic, size, mtime, stored_step) != (INDEX_MAGIC, stat.st_size, stat.st_mtime_ns, step):
+                    return False
+                offsets = array('q')
+                offsets.frombytes(file.read())
+        except (OSError, struct.error, ValueError):
+            return False
+        if len(offsets) != (count + step - 1) // step:
+            return False
+        self.step = step
+        self.count = count
+        self.offsets = offsets
+        return True
+
+    def write_index(self, index_path, stat):
+        # The index is only a cache: if it can't be written, it's rebuilt next time
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(index_path)), prefix=".EventRecorder-", suffix=".tmp")
+            with os.fdopen(fd, mode="wb") as file:
+                file.write(INDEX_HEADER.pack(INDEX_MAGIC, stat.st_size, stat.st_mtime_ns, self.step, self.count))
+                file.write(self.offsets.tobytes())
+            os.replace(tmp_path, index_path)
+        except OSError:
+            pass
+
+    def block(self, number):
+        rows = self.blocks.get(number)
+        if rows is not None:
+            self.blocks.move_to_end(number)
+            return rows
+        start = self.offsets[number]
+        end = self.offsets[number + 1] if number + 1 < len(self.offsets) else self.size
+        text = self.data[start:end].decode(self.encoding, errors="replace")
+        rows = [row + [''] * (3 - len(row)) for row in csv.reader(io.StringIO(text, newline="")) if row]
+        self.blocks[number] = rows
+        if len(self.blocks) > self.cached_blocks:
+            self.blocks.popitem(last=False)
+        return rows
+
+    def row(self, index):
+        return self.block(index // self.step)[index % self.step]
+
+    def cell(self, index, column):
+        return self.row(index)[column]
+
+    def rows(self):
+        for number in range(len(self.offsets)):
+            yield from self.block(number)
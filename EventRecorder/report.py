@@ -0,0 +1,166 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import date
+from functools import lru_cache
+from itertools import compress, repeat
+import csv
+import json
+import operator
+
+from event_store import format_date
+
+try:  # Optional, makes reports over millions of events several times faster
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Without NumPy, the conversions below work on whole arrays at a time with
+# map() over builtin operators and lookup tables, so the per-row work stays
+# in C as much as possible.
+
+@lru_cache(maxsize=None)
+def time_table():
+    # HHMMSS -> seconds since midnight
+    return [hms // 10000 * 3600 + hms // 100 % 100 * 60 + hms % 100 for hms in range(240000)]
+
+
+def split_stamps(stamps):
+    days = array('q', map(operator.floordiv, stamps, repeat(1000000)))
+    times = array('q', map(operator.mod, stamps, repeat(1000000)))
+    return days, times
+
+
+def day_seconds(day):
+    # YYYYMMDD -> seconds since 0001-01-01
+    return date(day // 10000, day // 100 % 100, day % 100).toordinal() * 86400
+
+
+def to_seconds(days, times):
+    # The calendar is only looked up once per distinct day
+    starts = {day: day_seconds(day) for day in set(days)}
+    return array('q', map(operator.add, map(starts.__getitem__, days), map(time_table().__getitem__, times)))
+
+
+def aggregate_with_python(stamps, events, max_gap):
+    day_keys, times = split_stamps(stamps)
+    seconds = to_seconds(day_keys, times)
+    durations = array('q', map(operator.sub, seconds[1:], seconds[:-1]))
+    keys = zip(day_keys, events)
+    if max_gap is not None:
+        kept = list(map(operator.le, durations, repeat(max_gap)))
+        keys = compress(keys, kept)
+        durations = compress(durations, kept)
+
+    # One dictionary update per event
+    totals = defaultdict(int)
+    for key, duration in zip(keys, durations):
+        totals[key] += duration
+    per_day = {}
+    for (day, label), duration in sorted(totals.items()):
+        per_day.setdefault(day, {})[label] = duration
+    return per_day
+
+
+def aggregate_with_numpy(stamps, events, max_gap):
+    stamps = numpy.frombuffer(stamps, dtype=numpy.int64)
+    day_keys, times = numpy.divmod(stamps, 1000000)
+    days, day_index = numpy.unique(day_keys, return_inverse=True)
+    starts = numpy.fromiter(map(day_seconds, days.tolist()), dtype=numpy.int64, count=len(days))
+    seconds = starts[day_index] + times // 10000 * 3600 + times // 100 % 100 * 60 + times % 100
+    durations = numpy.diff(seconds)
+
+    # Sorted labels make the sorted keys below come out by day, then label
+    labels = sorted(set(events))
+    codes = {label: code for code, label in enumerate(labels)}
+    label_index = numpy.fromiter(map(codes.__getitem__, events), dtype=numpy.int64, count=len(events))
+    keys = day_index[:-1] * len(labels) + label_index[:-1]
+    if max_gap is not None:
+        kept = durations <= max_gap
+        keys = keys[kept]
+        durations = durations[kept]
+
+    if not len(keys):
+        return {}
+    # Only the (day, label) pairs that occur, not every combination
+    keys, key_index = numpy.unique(keys, return_inverse=True)
+    sums = numpy.bincount(key_index, weights=durations, minlength=len(keys)).astype(numpy.int64).tolist()
+    key_days, key_labels = numpy.divmod(keys, len(labels))
+    key_labels = list(map(labels.__getitem__, key_labels.tolist()))
+    bounds = [0, *(numpy.flatnonzero(numpy.diff(key_days)) + 1).tolist(), len(keys)]
+    return {
+        int(days[key_days[begin]]): dict(zip(key_labels[begin:end], sums[begin:end]))
+        for begin, end in zip(bounds, bounds[1:])
+    }
+
+
+def week_of(day):
+    year, week, _ = date.fromisoformat(day).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def format_duration(seconds):
+    return "%d:%02d:%02d" % (seconds // 3600, seconds // 60 % 60, seconds % 60)
+
+
+def build_report(stamps, events, start=None, end=None, max_gap=None):
+    """Time spent on each event, from its timestamp to the next event's.
+
+    Takes the sorted stamps and events of an EventStore, optionally limited
+    to the `start`-`end` stamps. Durations longer than `max_gap` seconds (a
+    night, a weekend...) are left out, and so is the last event, which has
+    no end yet. Durations are attributed to the day the event started.
+
+    Returns {"labels": {label: seconds}, "days": {day: {label: seconds}},
+    "weeks": {week: {label: seconds}}}.
+    """
+    first = 0 if start is None else bisect_left(stamps, start)
+    last = len(stamps) if end is None else bisect_right(stamps, end)
+    stamps = stamps[first:last]
+    events = events[first:last]
+
+    if len(stamps) < 2:
+        per_day = {}
+    elif numpy is not None:
+        per_day = aggregate_with_numpy(stamps, events, max_gap)
+    else:
+        per_day = aggregate_with_python(stamps, events, max_gap)
+
+    # Everything from here on is per day or per (day, label), not per event;
+    # dates and weeks are worked out once per day
+    totals = defaultdict(int)
+    days = {}
+    weeks = defaultdict(lambda: defaultdict(int))
+    for day, labels in sorted(per_day.items()):
+        day = format_date(day * 1000000)
+        days[day] = labels
+        week = weeks[week_of(day)]
+        for label, duration in labels.items():
+            totals[label] += duration
+            week[label] += duration
+
+    return {
+        "labels": dict(sorted(totals.items(), key=lambda item: -item[1])),
+        "days": days,
+        "weeks": {week: dict(labels) for week, labels in weeks.items()},
+    }
+
+
+def report_rows(report):
+    yield ["Period", "Key", "Event", "Seconds", "Duration"]
+    for label, seconds in report["labels"].items():
+        yield ["total", "", label, seconds, format_duration(seconds)]
+    for period in ("days", "weeks"):
+        for key, labels in report[period].items():
+            for label, seconds in labels.items():
+                yield [period[:-1], key, label, seconds, format_duration(seconds)]
+
+
+def write_report(report, path):
+    # The format follows the file extension: .json, anything else is CSV
+    with open(path, mode="w", newline="") as file:
+        if path.lower().endswith(".json"):
+            json.dump(report, file, indent=2)
+        else:
+            csv.writer(file).writerows(report_rows(report))
@@ -0,0 +1,508 @@
+from array import array
+from bisect import bisect_left, bisect_right
+import csv
+import functools
+import io
+import locale
+import os
+from pathlib import Path
+import shutil
+import sys
+import tempfile
+
+from event_store import EventStore, parse_row, read_csv_batches
+
+# Event logs can be stored in two formats, each with its own journal class:
+# CSV files, the default, and SQLite databases for large logs. Both offer
+#   read_batches()             (stamps, events, errors, fraction read) tuples
+#   read_range(start, end)     EventStore of the events between two stamps,
+#                              and the malformed lines
+#   last_stamp()               stamp of the last event, 0 when empty
+#   append_rows(rows)          add [date, time, event] rows in one commit
+#   inserted(store, position)  save a new event, False if it needs a flush
+#   edited(old, new)           a (stamp, event) row changed, saved on flush
+#   removed(stamps, events)    rows were deleted, saved on flush
+#   removed_before(stamp, rows)  every event before the stamp was deleted
+#   mark_dirty(rows)           rows changed some other way: the next flush
+#                              saves the whole store
+#   save(store)                replace the log with the events of a store
+#   flush(store), rewrite(rows), close()
+# and report failed writes as OSError, keeping the rows they couldn't write
+# for the next flush.
+# `sorted_appends` tells whether appended rows have to come after the last
+# event of the log. When they do, rows that can't be appended go to
+#   log_rows(rows)             the write-ahead log, until the next flush
+# `newest_first` tells whether read_batches(newest_first=True) starts with
+# the most recent events without reading the rest, so the window can show
+# them at once and read the older ones in the background.
+
+SQLITE_SUFFIXES = (".sqlite", ".sqlite3", ".db")
+
+
+def is_sqlite(path):
+    return path.lower().endswith(SQLITE_SUFFIXES)
+
+
+def open_journal(path):
+    # The format follows the file extension
+    return SqliteJournal(path) if is_sqlite(path) else CsvJournal(path)
+
+
+def sync_directory(path):
+    # Makes a new or renamed file in the directory survive a power loss.
+    # Directories can't be opened on Windows, which doesn't need it anyway.
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def append_synced(path, text):
+    # Appends to a file and syncs it to disk. A last line left unfinished by
+    # a crash is ended first, so that it doesn't swallow the first new row:
+    # it stays a malformed line on its own instead.
+    with open(path, mode="a+b") as file:
+        end = file.seek(0, os.SEEK_END)
+        if end:
+            file.seek(end - 1)
+            if file.read(1) != b"\n":
+                file.write(b"\n")  # Appending mode always writes at the end
+        file.write(text.encode(locale.getpreferredencoding(False)))
+        file.flush()
+        os.fsync(file.fileno())
+
+
+def read_store(path):
+    # Loads a whole event log, returns the store and the malformed lines
+    store = EventStore()
+    errors = []
+    late = None
+    journal = open_journal(path)
+    try:
+        for stamps, events, batch_errors, _ in journal.read_batches():
+            # Rows from the first one out of order on are merged in once, at
+            # the end. That's everything for an unsorted file, and only the
+            # replayed events for a file with a write-ahead log.
+            if late is None and not store.is_in_order(stamps):
+                late = EventStore()
+            target = store if late is None else late
+            target.stamps.extend(stamps)
+            target.events.extend(events)
+            errors.extend(batch_errors)
+    finally:
+        journal.close()
+    if late is not None:
+        store.merge(late.stamps, late.events)
+    return store, errors
+
+
+def add_events(path, incoming):
+    # Appends the new events when they all come after the last one in the
+    # file or the log doesn't need that, otherwise merges them in and
+    # rewrites the file once
+    journal = open_journal(path)
+    try:
+        last = journal.last_stamp()
+        if not journal.sorted_appends or (last is not None and incoming.stamps[0] >= last):
+            journal.append_rows(incoming.rows())
+            return
+        store = EventStore()
+        if os.path.exists(path):
+            store, errors = read_store(path)
+            if errors:
+                raise ValueError(f"{path} has {len(errors)} malformed lines (first at line {errors[0][0]}), "
+                                 "fix them before adding events out of order")
+        store.extend(incoming.stamps, incoming.events)
+        journal.rewrite(store.rows())
+    finally:
+        journal.close()
+
+
+def migrate(source, target):
+    """Copies the event log `source` to `target`, converting between CSV
+    and SQLite along the way. Refuses to drop malformed lines, and checks
+    the copy against the original before returning its event count."""
+    if os.path.exists(target):
+        raise ValueError(f"{target} already exists")
+    store, errors = read_store(source)
+    if errors:
+        raise ValueError(f"{source} has {len(errors)} malformed lines (first at line {errors[0][0]}), "
+                         "fix them before migrating")
+    journal = open_journal(target)
+    try:
+        journal.save(store)
+    finally:
+        journal.close()
+    copy, _ = read_store(target)
+    if copy.stamps != store.stamps or copy.events != store.events:
+        os.unlink(target)
+        raise ValueError(f"{target} doesn't match {source} after migrating")
+    return len(store)
+
+
+class CsvJournal:
+    """Persists the event log to a CSV file.
+
+    New events are appended as a single line and synced to disk, so recording
+    an event costs the same no matter how big the file is. Edits and deletes
+    only mark the file dirty: the next flush() rewrites it once, atomically.
+    `dirty` counts the rows changed since the last rewrite.
+
+    Events older than the last one can't be appended to the sorted file.
+    Until the rewrite, they are kept in a write-ahead log next to it, synced
+    like the appends, and read back after the file itself. The write-ahead
+    log names the inode of the file it belongs to: a rewrite replaces the
+    file with a new one, so a log left behind by a crash right after the
+    rewrite is recognised as stale and ignored.
+    """
+
+    sorted_appends = True
+    newest_first = False
+
+    def __init__(self, path):
+        self.path = path
+        self.wal_path = path + ".wal"
+        self.dirty = 0
+
+    def close(self):
+        pass
+
+    def read_batches(self):
+        size = os.path.getsize(self.path)
+        with open(self.path, mode="rb") as file:
+            for stamps, events, errors, position in read_csv_batches(file):
+                yield stamps, events, errors, position / size if size else 1.0
+        # Replaying the write-ahead log only depends on its own size
+        name = os.path.basename(self.wal_path)
+        for stamps, events, errors, _ in read_csv_batches(io.BytesIO(self.read_wal())):
+            yield stamps, events, [(line + 1, f"{message} (in {name})") for line, message in errors], 1.0
+
+    def wal_header(self):
+        return f"# EventRecorder write-ahead log of inode {os.stat(self.path).st_ino}\n"
+
+    def read_wal(self):
+        # The complete lines of the write-ahead log, nothing if there is none
+        # or it's stale
+        try:
+            with open(self.wal_path, mode="rb") as file:
+                header = file.readline()
+                data = file.read()
+            if header.decode("ascii", errors="replace") != self.wal_header():
+                return b""
+        except FileNotFoundError:
+            return b""
+        # A line cut short by a crash is dropped
+        return data[:data.rfind(b"\n") + 1]
+
+    def log_rows(self, rows):
+        lines = io.StringIO()
+        csv.writer(lines).writerows(rows)
+        open(self.path, mode="a").close()  # The header needs the file to exist
+        header = self.wal_header()
+        try:
+            with open(self.wal_path, mode="r", newline="") as file:
+                started = file.readline() == header
+        except (FileNotFoundError, UnicodeDecodeError):
+            started = False
+        try:
+            if started:
+                append_synced(self.wal_path, lines.getvalue())
+                return
+            with open(self.wal_path, mode="w", newline="") as file:
+                file.write(header + lines.getvalue())
+                file.flush()
+                os.fsync(file.fileno())
+            sync_directory(os.path.dirname(os.path.abspath(self.path)))
+        except OSError:
+            self.mark_dirty(len(rows))  # Saved with the next rewrite instead
+            raise
+
+    def read_range(self, start=None, end=None):
+        # A CSV file has to be read whole to find the range
+        store, errors = read_store(self.path)
+        first = 0 if start is None else bisect_left(store.stamps, start)
+        last = len(store) if end is None else bisect_right(store.stamps, end)
+        if first > 0 or last < len(store):
+            store.stamps, store.events = store.stamps[first:last], store.events[first:last]
+        return store, errors
+
+    def append(self, row):
+        self.append_rows([row])
+
+    def append_rows(self, rows):
+        rows = list(rows)
+        lines = io.StringIO()
+        csv.writer(lines).writerows(rows)
+        try:
+            append_synced(self.path, lines.getvalue())
+        except OSError:
+            self.mark_dirty(len(rows))  # Saved with the next rewrite instead
+            raise
+
+    def inserted(self, store, position):
+        # The file is kept sorted too, so a new event can simply be appended
+        # to it unless it is older than the last recorded one. Returns False
+        # when the file needs a rewrite instead.
+        if position != len(store) - 1:
+            self.log_rows([store.row(position)])
+            self.mark_dirty()
+            return False
+        self.append(store.row(position))
+        return True
+
+    def last_stamp(self):
+        # Stamp of the last event in the file, read from its tail. 0 when the
+        # file is empty, None when the last line can't be parsed on its own.
+        try:
+            with open(self.path, mode="rb") as file:
+                file.seek(0, os.SEEK_END)
+                file.seek(max(0, file.tell() - 4096))
+                lines = file.read().decode(locale.getpreferredencoding(False), errors="replace").splitlines()
+        except FileNotFoundError:
+            return 0
+        for line in reversed(lines):
+            if line.strip():
+                try:
+                    return parse_row(next(csv.reader([line])))[0]
+                except (ValueError, csv.Error):
+                    return None
+        return 0
+
+    def mark_dirty(self, rows=1):
+        self.dirty += rows
+
+    # A CSV file is rewritten whatever changed
+    def edited(self, old, new):
+        self.mark_dirty()
+
+    def removed(self, stamps, events):
+        self.mark_dirty(len(stamps))
+
+    def removed_before(self, stamp, rows):
+        self.mark_dirty(rows)
+
+    def flush(self, store):
+        if self.dirty:
+            self.save(store)
+
+    def save(self, store):
+        self.rewrite(store.rows())
+
+    def rewrite(self, rows):
+        # Write to a temporary file next to the target and rename it over the
+        # original, so a crash never leaves a half-written log behind
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".EventRecorder-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, mode="w", newline="") as file:
+                csv.writer(file).writerows(rows)
+                file.flush()
+                os.fsync(file.fileno())
+            if os.path.exists(self.path):
+                shutil.copymode(self.path, tmp_path)
+            os.replace(tmp_path, self.path)
+            sync_directory(directory)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        # The events of the write-ahead log are in the file now
+        try:
+            os.unlink(self.wal_path)
+        except FileNotFoundError:
+            pass
+        self.dirty = 0
+
+
+def database_errors(method):
+    # SQLite reports a locked database or a full disk with its own errors,
+    # which are turned into the OSError a failed CSV write raises
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        import sqlite3
+
+        try:
+            return method(self, *args, **kwargs)
+        except sqlite3.Error as e:
+            raise OSError(f"{self.path}: {e}") from e
+    return wrapper
+
+
+class SqliteJournal:
+    """Persists the event log to a SQLite database.
+
+    Events are kept in a single table indexed on their stamp, so reading a
+    date range, adding an event in order or not, and editing or deleting
+    one don't depend on the size of the log. The database runs in WAL mode
+    and every append is one transaction, however many rows it adds. Edits
+    and deletes are applied on flush(), each with a targeted statement, all
+    in one transaction. Only save() and rewrite() replace the whole table.
+    The most recent events can be read first, straight from the end of the
+    stamp index, so the window shows a log of any size at once.
+    """
+
+    sorted_appends = False
+    newest_first = True
+    batch_size = 20000
+
+    def __init__(self, path):
+        self.path = path
+        self.dirty = 0
+        self.changes = []  # (statement, parameters) waiting for the flush
+        self.replace_all = False
+        self.connection = None
+
+    def connect(self):
+        if self.connection is None:
+            import sqlite3  # Only loaded for SQLite logs
+
+            self.connection = sqlite3.connect(self.path)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=FULL")
+            with self.connection:
+                self.connection.execute("CREATE TABLE IF NOT EXISTS events (stamp INTEGER NOT NULL, event TEXT NOT NULL)")
+                self.connection.execute("CREATE INDEX IF NOT EXISTS events_stamp ON events (stamp)")
+        return self.connection
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def select(self, connection, start, end, columns, order=""):
+        # Events with the same stamp stay in the order they were added
+        query = f"SELECT {columns} FROM events WHERE stamp BETWEEN ? AND ?"
+        if order is not None:
+            query += f" ORDER BY stamp {order}, rowid {order}"
+        return connection.execute(query, (-1 if start is None else start, sys.maxsize if end is None else end))
+
+    def read_batches(self, start=None, end=None, newest_first=False):
+        # Uses its own connection, so it can run on another thread. Newest
+        # first, the batches come from the end of the log, each still in
+        # order, and all from the same snapshot of the database.
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"No such file: '{self.path}'")
+        import sqlite3
+
+        connection = sqlite3.connect(Path(self.path).absolute().as_uri() + "?mode=ro", uri=True)
+        try:
+            if newest_first:
+                # Counting the rows would read the whole index, the progress
+                # goes by the stamps instead. Separate queries keep min and
+                # max at one index lookup each.
+                first = self.select(connection, start, end, "min(stamp)", None).fetchone()[0]
+                last = self.select(connection, start, end, "max(stamp)", None).fetchone()[0]
+                cursor = self.select(connection, start, end, "stamp, event", "DESC")
+            else:
+                total = self.select(connection, start, end, "count(*)", None).fetchone()[0]
+                cursor = self.select(connection, start, end, "stamp, event")
+            done = 0
+            size = self.batch_size
+            while True:
+                rows = cursor.fetchmany(size)
+                if not rows:
+                    break
+                if newest_first:
+                    # Each batch goes in front of the store, which copies it:
+                    # growing batches keep that to a few copies in all
+                    size = min(size * 2, 16 * self.batch_size)
+                    rows.reverse()
+                    progress = (last - rows[0][0]) / (last - first) if last > first else 1.0
+                else:
+                    done += len(rows)
+                    progress = done / total
+                stamps, events = zip(*rows)
+                yield array('q', stamps), list(map(sys.intern, events)), [], progress
+        finally:
+            connection.close()
+
+    def read_range(self, start=None, end=None):
+        store = EventStore()
+        for stamps, events, _, _ in self.read_batches(start, end):
+            store.stamps.extend(stamps)
+            store.events.extend(events)
+        return store, []
+
+    @database_errors
+    def last_stamp(self):
+        if not os.path.exists(self.path):
+            return 0
+        return self.connect().execute("SELECT max(stamp) FROM events").fetchone()[0] or 0
+
+    def insert(self, pairs):
+        try:
+            self.execute("INSERT INTO events (stamp, event) VALUES (?, ?)", pairs)
+        except OSError:
+            # Tried again with the next flush, with the edits that follow
+            self.changes.append(("INSERT INTO events (stamp, event) VALUES (?, ?)", pairs))
+            self.dirty += len(pairs)
+            raise
+
+    @database_errors
+    def execute(self, statement, parameters):
+        connection = self.connect()
+        with connection:
+            connection.executemany(statement, parameters)
+
+    def append(self, row):
+        self.append_rows([row])
+
+    def append_rows(self, rows):
+        self.insert([parse_row(row) for row in rows])
+
+    def inserted(self, store, position):
+        # The index keeps the order, the event can go anywhere in the log
+        self.insert([(store.stamps[position], store.events[position])])
+        return True
+
+    # Edits and deletes are kept as statements until the flush. Rows are
+    # found through the stamp index; rows with the same stamp and event are
+    # interchangeable, so any one of them will do.
+    def edited(self, old, new):
+        self.changes.append(("UPDATE events SET stamp = ?, event = ? WHERE rowid = "
+                             "(SELECT rowid FROM events WHERE stamp = ? AND event = ? LIMIT 1)", [new + old]))
+        self.dirty += 1
+
+    def removed(self, stamps, events):
+        self.changes.append(("DELETE FROM events WHERE rowid = "
+                             "(SELECT rowid FROM events WHERE stamp = ? AND event = ? LIMIT 1)", list(zip(stamps, events))))
+        self.dirty += len(stamps)
+
+    def removed_before(self, stamp, rows):
+        self.changes.append(("DELETE FROM events WHERE stamp < ?", [(stamp,)]))
+        self.dirty += rows
+
+    def mark_dirty(self, rows=1):
+        self.dirty += rows
+        self.replace_all = True
+
+    @database_errors
+    def flush(self, store):
+        if self.replace_all:
+            self.save(store)
+        elif self.changes:
+            connection = self.connect()
+            with connection:
+                for statement, parameters in self.changes:
+                    connection.executemany(statement, parameters)
+            self.changes = []
+            self.dirty = 0
+
+    def save(self, store):
+        # Only with the whole log in the store: its events replace the table
+        self.replace(zip(store.stamps, store.events))
+
+    def rewrite(self, rows):
+        self.replace(map(parse_row, rows))
+
+    @database_errors
+    def replace(self, pairs):
+        connection = self.connect()
+        with connection:
+            connection.execute("DELETE FROM events")
+            connection.executemany("INSERT INTO events (stamp, event) VALUES (?, ?)", pairs)
+        self.changes = []
+        self.replace_all = False
+        self.dirty = 0
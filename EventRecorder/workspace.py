@@ -0,0 +1,124 @@
+from collections import OrderedDict
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+
+from event_store import EventStore
+
+
+def store_size(store):
+    # Rough memory use: the stamps, one pointer per event and each distinct
+    # text once, since they're interned
+    return len(store) * 16 + sum(map(sys.getsizeof, set(store.events)))
+
+
+def write_snapshot(store, path):
+    # Pickle keeps repeated texts as references, so the snapshot stays about
+    # as compact as the store itself
+    with open(path, mode="wb") as file:
+        pickle.dump((store.stamps.tobytes(), store.events), file, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def read_snapshot(path):
+    with open(path, mode="rb") as file:
+        stamps, events = pickle.load(file)
+    store = EventStore()
+    store.stamps.frombytes(stamps)
+    store.events = list(map(sys.intern, events))
+    return store
+
+
+class OpenLog:
+    """A log open in the workspace, and what the window needs to show it."""
+
+    def __init__(self, path, store=None, journal=None, mapped_log=None):
+        self.path = path
+        self.store = EventStore() if store is None else store
+        self.journal = journal
+        self.mapped_log = mapped_log
+        self.snapshot = None  # Where the store went when it was evicted
+        self.size = 0
+
+    @property
+    def evicted(self):
+        return self.store is None
+
+
+class Workspace:
+    """The logs open in the window, least recently used first.
+
+    Only the active log has to be in memory. The others keep their store
+    while they fit in `budget` bytes; beyond that, the least recently used
+    ones are evicted to a snapshot file in a temporary directory, which is
+    much faster to read back than the original CSV file.
+    """
+
+    def __init__(self, budget=256 * 1024 * 1024):
+        self.budget = budget
+        self.logs = OrderedDict()
+        self.cache_dir = None
+
+    def __len__(self):
+        return len(self.logs)
+
+    def get(self, path):
+        return self.logs.get(path)
+
+    def add(self, log):
+        self.logs[log.path] = log
+        return log
+
+    def rename(self, log, path):
+        del self.logs[log.path]
+        log.path = path
+        self.logs[path] = log
+
+    def remove(self, log):
+        self.logs.pop(log.path, None)
+        self.drop_snapshot(log)
+        if log.journal is not None:
+            log.journal.close()
+        if log.mapped_log is not None:
+            log.mapped_log.close()
+
+    def activate(self, log):
+        # Brings the log back in memory, returns its store
+        self.logs.move_to_end(log.path)
+        if log.evicted:
+            log.store = read_snapshot(log.snapshot)
+            self.drop_snapshot(log)
+        self.evict(keep=log)
+        return log.store
+
+    def deactivate(self, log):
+        log.size = store_size(log.store)
+
+    def evict(self, keep=None):
+        in_memory = [log for log in self.logs.values() if not log.evicted]
+        used = sum(log.size for log in in_memory if log is not keep)
+        for log in in_memory:
+            if used <= self.budget:
+                break
+            if log is keep or not len(log.store):
+                continue
+            if self.cache_dir is None:
+                self.cache_dir = tempfile.mkdtemp(prefix="EventRecorder-")
+            fd, log.snapshot = tempfile.mkstemp(dir=self.cache_dir, suffix=".snapshot")
+            os.close(fd)
+            write_snapshot(log.store, log.snapshot)
+            log.store = None
+            used -= log.size
+
+    def drop_snapshot(self, log):
+        if log.snapshot is not None:
+            os.unlink(log.snapshot)
+            log.snapshot = None
+
+    def close(self):
+        for log in list(self.logs.values()):
+            self.remove(log)
+        if self.cache_dir is not None:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+            self.cache_dir = None
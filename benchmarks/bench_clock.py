@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+# Measures the CPU time an idle EventRecorder window uses to keep its clock
+# running, with the second-aligned clock and with the old behaviour of
+# polling every 200 ms and restyling the clock on every tick.
+#
+# Usage: python benchmarks/bench_clock.py [seconds]
+
+import os
+import sys
+import time
+from datetime import datetime
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'EventRecorder'))
+
+from PyQt6.QtCore import QTimer
+from PyQt6.QtWidgets import QApplication
+
+from EventRecorder import EventRecorder
+
+EventRecorder.choose_file = lambda self: None  # No file dialog, just the idle window
+
+
+def old_update_clock(window):
+    date = datetime.now().strftime("%Y-%m-%d")
+    clock = datetime.now().strftime("%H:%M:%S")
+    window.clock_label.setText(date + ", " + clock)
+    window.clock_label.setStyleSheet("background-color: rgb(230, 230, 230)")
+    window.clock_label.setReadOnly(True)
+
+
+def measure(app, seconds, legacy):
+    window = EventRecorder()
+    window.show()
+    ticks = 0
+
+    def tick():
+        nonlocal ticks
+        ticks += 1
+        if legacy:
+            old_update_clock(window)
+
+    if legacy:
+        window.timer.stop()
+        window.timer.timeout.disconnect()
+        window.timer.setSingleShot(False)
+        window.timer.timeout.connect(tick)
+        window.timer.start(200)
+    else:
+        window.timer.timeout.connect(tick)
+
+    app.processEvents()
+    QTimer.singleShot(int(seconds * 1000), app.quit)
+    start = time.process_time()
+    app.exec()
+    cpu = time.process_time() - start
+    window.timer.stop()
+    window.close()
+    return cpu, ticks
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    app = QApplication(sys.argv[:1])
+    print("%-16s  %12s  %8s  %14s" % ("clock", "CPU (ms)", "ticks", "CPU (% core)"))
+    for name, legacy in (("200 ms polling", True), ("second-aligned", False)):
+        cpu, ticks = measure(app, seconds, legacy)
+        print("%-16s  %12.1f  %8d  %14.3f" % (name, cpu * 1000, ticks, cpu / seconds * 100))
+
+
+if __name__ == "__main__":
+    main()
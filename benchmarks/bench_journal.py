@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+
+# Compares the cost of recording one event with the append-only journal
+# against the old behaviour of rewriting the whole CSV file on every record.
+#
+# Usage: python benchmarks/bench_journal.py [rows ...]
+
+import csv
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'EventRecorder'))
+
+from storage import CsvJournal
+
+RECORDS = 20
+
+
+def synthetic_rows(count):
+    for i in range(count):
+        minutes = i % (24 * 60)
+        yield ["2024-%02d-%02d" % (i // 31 % 12 + 1, i % 31 + 1), "%02d:%02d:00" % (minutes // 60, minutes % 60), "Event %d" % (i % 50)]
+
+
+def full_rewrite(path, rows):
+    with open(path, mode="w", newline="") as file:
+        csv.writer(file).writerows(rows)
+
+
+def bench(count):
+    rows = list(synthetic_rows(count))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "events.csv")
+        journal = CsvJournal(path)
+        journal.rewrite(rows)
+
+        start = time.perf_counter()
+        for i in range(RECORDS):
+            journal.append(["2025-01-01", "12:00:%02d" % i, "New event"])
+        append_cost = (time.perf_counter() - start) / RECORDS
+
+        start = time.perf_counter()
+        for i in range(RECORDS):
+            rows.append(["2025-01-01", "12:00:%02d" % i, "New event"])
+            full_rewrite(path, rows)
+        rewrite_cost = (time.perf_counter() - start) / RECORDS
+
+    return append_cost, rewrite_cost
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000, 10_000, 100_000, 1_000_000]
+    print("%10s  %16s  %16s" % ("rows", "append (ms)", "rewrite (ms)"))
+    for count in sizes:
+        append_cost, rewrite_cost = bench(count)
+        print("%10d  %16.3f  %16.3f" % (count, append_cost * 1000, rewrite_cost * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+# Measures how long EventRecorder takes to start: importing the script,
+# painting the window for the first time, showing the first rows of a log
+# and having the whole log loaded and ready to record events. Each run is a
+# fresh interpreter, the same way the application is started.
+#
+# Usage: python benchmarks/bench_startup.py [rows] [runs]
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'EventRecorder', 'EventRecorder.py')
+
+# Runs in the child process. Times are measured from just before the child
+# was spawned, so they include the interpreter startup.
+DRIVER = """
+import os, runpy, sys, time
+start = float(os.environ["BENCH_START"])
+
+def mark(name):
+    print(name, time.time() - start, flush=True)
+
+sys.argv = [sys.argv[1]]
+sys.path.insert(0, os.path.dirname(sys.argv[0]))
+module = runpy.run_path(sys.argv[0], run_name="bench")
+mark("import")
+
+from PyQt6.QtCore import QEvent, QObject
+from PyQt6.QtWidgets import QApplication
+EventRecorder = module["EventRecorder"]
+
+class FirstPaint(QObject):
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Type.Paint:
+            mark("first paint")
+            watched.removeEventFilter(self)
+        return False
+
+def choose_file(self):
+    # Stands in for picking the log in the start dialog
+    self.start_loading(os.environ["BENCH_LOG"])
+
+def add_loaded_batch(self, *args):
+    if not len(self.store):
+        mark("first rows")
+    original_add(self, *args)
+
+def finish_loading(self, loader):
+    original_finish(self, loader)
+    mark("usable")
+    app.quit()
+
+original_add = EventRecorder.add_loaded_batch
+original_finish = EventRecorder.finish_loading
+EventRecorder.choose_file = choose_file
+EventRecorder.add_loaded_batch = add_loaded_batch
+EventRecorder.finish_loading = finish_loading
+
+app = QApplication(sys.argv)
+window = EventRecorder()
+first_paint = FirstPaint()
+window.installEventFilter(first_paint)
+window.show()
+app.exec()
+"""
+
+MARKS = ("import", "first paint", "first rows", "usable")
+
+
+def write_log(path, rows):
+    # One event every 7 minutes and 13 seconds
+    start = datetime(2000, 1, 1)
+    with open(path, mode="w") as file:
+        for i in range(rows):
+            file.write((start + timedelta(seconds=433 * i)).strftime("%Y-%m-%d,%H:%M:%S") + ",Event %d\n" % (i % 50))
+
+
+def run_once(log, config_home):
+    env = dict(os.environ, BENCH_LOG=log, XDG_CONFIG_HOME=config_home, BENCH_START=repr(time.time()))
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    output = subprocess.run([sys.executable, "-c", DRIVER, SCRIPT], env=env, capture_output=True, text=True, check=True).stdout
+    times = {}
+    for line in output.splitlines():
+        name, _, seconds = line.rpartition(" ")
+        if name in MARKS:
+            times[name] = float(seconds)
+    return times
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    with tempfile.TemporaryDirectory() as directory:
+        log = os.path.join(directory, "events.csv")
+        write_log(log, rows)
+        run_once(log, directory)  # Warm up the disk cache and write the config
+        results = [run_once(log, directory) for _ in range(runs)]
+    print("%d rows, median of %d runs" % (rows, runs))
+    for name in MARKS:
+        print("%-12s  %8.1f ms" % (name, statistics.median(result[name] for result in results) * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+
+# Benchmarks the window's hot paths on synthetic logs of growing size:
+# loading a log, recording an event (in order and late), editing a time so
+# the row moves, deleting a large selection, saving the whole log and the
+# peak memory use. Each size runs in a fresh interpreter with Qt's offscreen
+# platform, so nothing is shown and the memory figures don't mix.
+#
+# Save the results of a release with --json and compare a later run against
+# them with --compare to see what got faster or slower.
+#
+# Usage: python benchmarks/bench_suite.py [--sizes 1k,10k,100k,1M,10M]
+#                                         [--json results.json] [--compare old.json]
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'EventRecorder')
+
+# Runs in the child process, writes its measurements as JSON on stdout
+DRIVER = """
+import json, os, statistics, sys, time
+sys.path.insert(0, sys.argv[1])
+path, deletes = sys.argv[2], int(sys.argv[3])
+
+from PyQt6.QtCore import QItemSelection, QItemSelectionModel
+from PyQt6.QtWidgets import QApplication
+from EventRecorder import EventRecorder
+from event_store import format_date, format_time
+from workspace import store_size
+
+results = {}
+
+def finish_loading(self, loader):
+    original_finish(self, loader)
+    results["load"] = time.perf_counter() - started
+    app.exit()  # quit() would close the window too
+
+original_finish = EventRecorder.finish_loading
+EventRecorder.finish_loading = finish_loading
+EventRecorder.choose_file = lambda self: None
+
+app = QApplication(sys.argv[:1])
+window = EventRecorder()
+window.show()
+app.processEvents()
+started = time.perf_counter()
+window.start_loading(path)
+app.exec()
+window.flush_journal()  # Not timed: a log loaded out of order is saved sorted
+rows = len(window.store)
+results["rows"] = rows
+
+def latencies(calls):
+    times = []
+    for call in calls:
+        start = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return {"median": statistics.median(times), "max": times[-1]}
+
+# New events, after the last one and older than it
+last = window.store.stamps[-1]
+late = window.store.stamps[rows // 2]
+results["record"] = latencies(
+    lambda i=i: window.record_event("Benchmark %d" % i, None, "%s, %s" % (format_date(last), format_time(last)))
+    for i in range(200))
+results["record late"] = latencies(
+    lambda i=i: window.record_event("Late %d" % i, None, "%s, %s" % (format_date(late), format_time(late)))
+    for i in range(20))
+window.flush_journal()
+
+# Editing the time of the first row moves it to the middle of the table
+def move_row():
+    window.model.setData(window.model.index(0, 1), format_time(window.store.stamps[rows // 2]))
+    window.flush_journal()
+
+results["edit and save"] = latencies(move_row for _ in range(5))
+
+# Saving the whole log
+start = time.perf_counter()
+window.write_table_to_csv()
+results["save"] = time.perf_counter() - start
+results["file size"] = os.path.getsize(path)
+
+# A block of rows in the middle, then every other row of the next block
+count = min(deletes, len(window.store) // 4)
+middle = len(window.store) // 2
+for name, step in (("delete block", 1), ("delete scattered", 2)):
+    selection = QItemSelection()
+    if step == 1:
+        selection.select(window.model.index(middle, 0), window.model.index(middle + count - 1, 2))
+    else:
+        for row in range(middle, middle + 2 * count, 2):
+            selection.select(window.model.index(row, 0), window.model.index(row, 2))
+    window.table.selectionModel().select(selection, QItemSelectionModel.SelectionFlag.ClearAndSelect)
+    start = time.perf_counter()
+    window.delete_selected()
+    window.flush_journal()
+    results[name] = time.perf_counter() - start
+results["deleted"] = count
+
+results["store size"] = store_size(window.store)
+try:
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results["peak memory"] = peak if sys.platform == "darwin" else peak * 1024
+except ImportError:
+    results["peak memory"] = None  # Not available on Windows
+
+window.close()
+print(json.dumps(results))
+"""
+
+
+def parse_size(text):
+    text = text.strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+
+def write_log(path, rows):
+    # Events every 7 minutes and 13 seconds, out of 50 distinct texts
+    start = datetime(2000, 1, 1)
+    step = timedelta(seconds=433)
+    with open(path, mode="w") as file:
+        for first in range(0, rows, 100_000):
+            file.writelines((start + step * i).strftime("%Y-%m-%d,%H:%M:%S") + ",Event %d\n" % (i % 50)
+                            for i in range(first, min(rows, first + 100_000)))
+
+
+def run_size(rows, deletes, directory):
+    path = os.path.join(directory, "events-%d.csv" % rows)
+    write_log(path, rows)
+    env = dict(os.environ, XDG_CONFIG_HOME=directory)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    env.pop("EVENTRECORDER_PROFILE", None)
+    try:
+        output = subprocess.run([sys.executable, "-c", DRIVER, SOURCE, path, str(deletes)],
+                                env=env, stdout=subprocess.PIPE, text=True, check=True).stdout
+    finally:
+        os.unlink(path)
+    return json.loads(output.splitlines()[-1])
+
+
+def describe():
+    try:
+        commit = subprocess.run(["git", "describe", "--always", "--dirty"], cwd=SOURCE,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    from PyQt6.QtCore import PYQT_VERSION_STR, QT_VERSION_STR
+
+    return {"date": time.strftime("%Y-%m-%d %H:%M:%S"), "commit": commit, "python": platform.python_version(),
+            "qt": QT_VERSION_STR, "pyqt": PYQT_VERSION_STR, "platform": platform.platform()}
+
+
+# Name, unit, how to read it from the results of one size
+METRICS = (
+    ("load", "s", lambda r: r["load"]),
+    ("load rate", "rows/s", lambda r: r["rows"] / r["load"]),
+    ("record", "ms", lambda r: r["record"]["median"] * 1000),
+    ("record max", "ms", lambda r: r["record"]["max"] * 1000),
+    ("record late", "ms", lambda r: r["record late"]["median"] * 1000),
+    ("edit and save", "ms", lambda r: r["edit and save"]["median"] * 1000),
+    ("save", "s", lambda r: r["save"]),
+    ("save rate", "MB/s", lambda r: r["file size"] / r["save"] / 1e6),
+    ("delete block", "s", lambda r: r["delete block"]),
+    ("delete scattered", "s", lambda r: r["delete scattered"]),
+    ("store size", "MB", lambda r: r["store size"] / 1e6),
+    ("peak memory", "MB", lambda r: r["peak memory"] / 1e6 if r["peak memory"] else float("nan")),
+)
+
+
+def print_table(results, baseline=None):
+    sizes = list(results)
+    print("%-22s" % "rows" + "".join("%14s" % size for size in sizes))
+    for name, unit, value in METRICS:
+        line = "%-22s" % ("%s (%s)" % (name, unit))
+        for size in sizes:
+            number = value(results[size])
+            cell = "%.0f" % number if number >= 1000 else "%.3g" % number
+            if baseline and size in baseline:
+                old = value(baseline[size])
+                if old:
+                    cell += " %+.0f%%" % ((number / old - 1) * 100)
+            line += "%14s" % cell
+        print(line)
+    deleted = {size: results[size]["deleted"] for size in sizes}
+    print("Deletes remove %s rows, the scattered one every other row." % ", ".join("%d" % n for n in deleted.values()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark EventRecorder on synthetic logs.")
+    parser.add_argument("--sizes", default="1k,10k,100k,1M", help="log sizes, e.g. 1k,10k,100k,1M,10M (default: %(default)s)")
+    parser.add_argument("--deletes", type=int, default=10_000, help="rows per delete, at most a quarter of the log (default: %(default)s)")
+    parser.add_argument("--json", help="save the results to this file")
+    parser.add_argument("--compare", help="show the change against results saved with --json")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["results"]
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes.split(","):
+            print("Running %s rows..." % size.strip(), file=sys.stderr, flush=True)
+            results[size.strip()] = run_size(parse_size(size), args.deletes, directory)
+    print_table(results, baseline)
+    if args.json:
+        with open(args.json, mode="w") as file:
+            json.dump({"environment": describe(), "results": results}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'EventRecorder'))
+
+from cli import cmd_export, cmd_record, cmd_stats, main, parse_args, parse_at  # noqa: E402
+
+
+@pytest.mark.parametrize("argv, events", [
+    (["record", "log.csv", "a", "b", "--at", "2024-01-01 10:00:00"], ["a", "b"]),
+    (["record", "log.csv", "--at", "2024-01-01 10:00:00", "a", "b"], ["a", "b"]),
+    (["record", "log.csv", "a", "--at", "2024-01-01 10:00:00", "b"], ["a", "b"]),
+])
+def test_record_options_go_anywhere(argv, events):
+    args = parse_args(argv)
+    assert args.command == "record"
+    assert args.run is cmd_record
+    assert args.file == "log.csv"
+    assert args.events == events
+    assert args.at == "2024-01-01 10:00:00"
+
+
+def test_record_without_options():
+    args = parse_args(["record", "log.csv", "a"])
+    assert args.events == ["a"]
+    assert args.at is None
+
+
+def test_export_and_stats_arguments():
+    args = parse_args(["export", "log.csv", "--search", "coffee", "out.csv", "--from", "2024-01-01"])
+    assert args.run is cmd_export
+    assert (args.file, args.output, args.search, args.start, args.end) == ("log.csv", "out.csv", "coffee", "2024-01-01", None)
+
+    args = parse_args(["stats", "log.csv", "--max-gap", "30", "--to", "2024-02-01"])
+    assert args.run is cmd_stats
+    assert (args.max_gap, args.end, args.output) == (30, "2024-02-01", None)
+
+
+@pytest.mark.parametrize("argv", [[], ["record"], ["record", "log.csv", "--bogus", "a"], ["stats", "log.csv", "--max-gap", "x"]])
+def test_bad_arguments_exit(argv, capsys):
+    with pytest.raises(SystemExit) as exit:
+        parse_args(argv)
+    assert exit.value.code == 2
+
+
+def test_parse_at():
+    assert parse_at(" 2024-01-02 03:04:05 ") == 20240102030405
+    with pytest.raises(ValueError, match="--at"):
+        parse_at("2024-01-02 25:00:00")
+    with pytest.raises(ValueError, match="--at"):
+        parse_at("yesterday")
+
+
+def test_record_then_export(tmp_path, capsys):
+    path = str(tmp_path / "log.csv")
+    assert main(["record", path, "first", "--at", "2024-01-01 10:00:00", "second"]) == 0
+    assert main(["record", path, "--at", "2024-01-01 09:00:00", "earlier"]) == 0
+    capsys.readouterr()
+
+    assert main(["export", path]) == 0
+    assert capsys.readouterr().out.splitlines() == [
+        "2024-01-01,09:00:00,earlier",
+        "2024-01-01,10:00:00,first",
+        "2024-01-01,10:00:00,second",
+    ]
+
+
+def test_errors_are_reported(tmp_path, capsys):
+    assert main(["record", str(tmp_path / "log.csv"), "a", "--at", "soon"]) == 1
+    assert "Invalid time for --at" in capsys.readouterr().err
+    assert main(["export", str(tmp_path / "missing" / "log.csv")]) == 1
@@ -0,0 +1,121 @@
+import os
+import sys
+from array import array
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'EventRecorder'))
+
+from event_index import EventIndex  # noqa: E402
+from event_store import EventStore  # noqa: E402
+
+TEXTS = ["Coffee", "Code review", "coffee break", "Lunch", "Call with Ann", "code"]
+QUERIES = ["", "co", "coffee", "code r", "with ann", "e", "zzz", "-", "  LUNCH "]
+
+
+def stamp(row):
+    return 20240101000000 + row // 60 % 24 * 10000 + row % 60 * 100
+
+
+def indexed_store(rows=40):
+    store = EventStore()
+    store.extend(array('q', map(stamp, range(rows))), [TEXTS[i % len(TEXTS)] for i in range(rows)])
+    store.index = EventIndex(store)
+    store.index.rebuild()
+    return store
+
+
+def expected(store, text, start=None, end=None):
+    needle = text.strip().lower()
+    return [i for i, (row_stamp, event) in enumerate(zip(store.stamps, store.events))
+            if needle in event.lower()
+            and (start is None or row_stamp >= start) and (end is None or row_stamp <= end)]
+
+
+def assert_matches_rebuild(store):
+    index = store.index
+    assert index.valid
+    fresh = EventIndex(store)
+    fresh.rebuild()
+    assert index.postings == fresh.postings
+    assert index.tokens == fresh.tokens
+    assert index.texts == fresh.texts
+
+
+def assert_searches(store):
+    for text in QUERIES:
+        for start, end in [(None, None), (stamp(5), stamp(20)), (stamp(100), None)]:
+            assert list(store.index.search(text, start, end)) == expected(store, text, start, end)
+
+
+def test_appends_keep_the_index():
+    store = indexed_store()
+    store.insert(stamp(50), "New meeting")
+    store.insert(stamp(51), "coffee")
+    assert_matches_rebuild(store)
+    assert_searches(store)
+
+
+def test_insert_in_the_middle_makes_it_stale():
+    store = indexed_store()
+    store.insert(stamp(10), "New meeting")
+    assert not store.index.valid
+    assert_searches(store)
+    store.index.rebuild()
+    assert_matches_rebuild(store)
+
+
+def test_removing_the_last_rows_keeps_the_index():
+    store = indexed_store()
+    store.insert(stamp(50), "Only once")
+    store.remove_ranges([(30, len(store))])
+    assert_matches_rebuild(store)
+    assert "only" not in store.index.tokens
+    assert_searches(store)
+
+
+def test_removing_other_rows_makes_it_stale():
+    store = indexed_store()
+    store.remove_ranges([(3, 9), (20, 22)])
+    assert not store.index.valid
+    assert_searches(store)
+    store.index.rebuild()
+    assert_matches_rebuild(store)
+
+
+@pytest.mark.parametrize("new_text", ["Lunch", "Something new", "Coffee"])
+def test_changed_events_keep_the_index(new_text):
+    store = indexed_store()
+    store.set_event(0, new_text)
+    store.set_event(7, new_text)
+    store.set_event(len(store) - 1, new_text)
+    assert_matches_rebuild(store)
+    assert_searches(store)
+
+
+def test_stale_index_learns_new_words():
+    store = indexed_store()
+    store.set_stamp(0, stamp(45))
+    assert not store.index.valid
+    store.set_event(3, "Dentist")
+    store.insert(stamp(2), "Gym")
+    store.extend(array('q', [stamp(60)]), ["Train"])
+    for text in ["dentist", "gym", "train", "coffee"]:
+        assert list(store.index.search(text)) == expected(store, text)
+    store.index.rebuild()
+    assert_matches_rebuild(store)
+
+
+def test_search_when_every_text_matches():
+    store = indexed_store()
+    assert store.index.search("c", stamp(5), stamp(20)) == range(5, 21)
+    store.set_event(4, "Gym")
+    assert list(store.index.search("c")) == expected(store, "c")
+
+
+def test_search_results_do_not_follow_later_edits():
+    store = indexed_store()
+    store.set_event(0, "Unique")
+    found = store.index.search("unique")
+    store.insert(stamp(50), "Unique")
+    assert list(found) == [0]
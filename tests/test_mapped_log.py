@@ -0,0 +1,114 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'EventRecorder'))
+
+from mapped_log import MappedCsvLog  # noqa: E402
+
+ROWS = [["2024-01-%02d" % day, "10:00:00", "event %d" % day] for day in range(1, 8)]
+LINES = ["%s,%s,%s" % tuple(row) for row in ROWS]
+
+FILES = {
+    "trailing newline": ("\n".join(LINES) + "\n", ROWS),
+    "no trailing newline": ("\n".join(LINES), ROWS),
+    "crlf": ("\r\n".join(LINES) + "\r\n", ROWS),
+    "blank lines": ("\n" + "\n\n".join(LINES) + "\n\n", ROWS),
+    "crlf blank lines": ("\r\n".join(LINES[:3]) + "\r\n\r\n" + "\r\n".join(LINES[3:]), ROWS),
+    "quoted": ("\n".join(LINES[:2]) + '\n2024-01-03,10:00:00,"two\nlines"\n' + "\n".join(LINES[3:]) + "\n",
+               ROWS[:2] + [["2024-01-03", "10:00:00", "two\nlines"]] + ROWS[3:]),
+    "empty": ("", []),
+}
+
+
+def write_file(path, text):
+    with open(path, mode="w", newline="") as file:
+        file.write(text)
+    return str(path)
+
+
+def counting_builds(monkeypatch):
+    builds = []
+    build_index = MappedCsvLog.build_index
+
+    def counted(self, step, progress):
+        builds.append(step)
+        build_index(self, step, progress)
+    monkeypatch.setattr(MappedCsvLog, "build_index", counted)
+    return builds
+
+
+@pytest.mark.parametrize("name", FILES)
+@pytest.mark.parametrize("step", [1, 2, 3, 64])
+def test_rows_are_counted_and_read(tmp_path, name, step):
+    text, rows = FILES[name]
+    log = MappedCsvLog(write_file(tmp_path / "log.csv", text), step=step, persist_index=False)
+    try:
+        assert len(log) == len(rows)
+        assert list(log.rows()) == rows
+        assert [log.row(i) for i in range(len(log))] == rows
+    finally:
+        log.close()
+
+
+@pytest.mark.parametrize("name", ["trailing newline", "no trailing newline", "crlf"])
+@pytest.mark.parametrize("step", [1, 2, 3, 7, 64])
+def test_line_scan_matches_record_scan(tmp_path, name, step):
+    log = MappedCsvLog(write_file(tmp_path / "log.csv", FILES[name][0]), persist_index=False)
+    try:
+        lines = log.scan_lines(step, lambda done: True)
+        records = log.scan_records(step, lambda done: True)
+        assert lines == records
+    finally:
+        log.close()
+
+
+def test_saved_index_is_reused(tmp_path, monkeypatch):
+    path = write_file(tmp_path / "log.csv", FILES["trailing newline"][0])
+    MappedCsvLog(path, step=2).close()
+    assert os.path.exists(path + ".idx")
+
+    builds = counting_builds(monkeypatch)
+    log = MappedCsvLog(path, step=2)
+    assert builds == []
+    assert list(log.rows()) == ROWS
+    log.close()
+
+
+def test_index_of_a_changed_file_is_rebuilt(tmp_path, monkeypatch):
+    path = write_file(tmp_path / "log.csv", FILES["trailing newline"][0])
+    MappedCsvLog(path, step=2).close()
+    with open(path, mode="a") as file:
+        file.write("2024-01-08,10:00:00,event 8\n")
+
+    builds = counting_builds(monkeypatch)
+    log = MappedCsvLog(path, step=2)
+    assert builds == [2]
+    assert len(log) == len(ROWS) + 1
+    log.close()
+
+
+def test_index_with_another_step_is_rebuilt(tmp_path, monkeypatch):
+    path = write_file(tmp_path / "log.csv", FILES["trailing newline"][0])
+    MappedCsvLog(path, step=2).close()
+
+    builds = counting_builds(monkeypatch)
+    log = MappedCsvLog(path, step=3)
+    assert builds == [3]
+    assert list(log.rows()) == ROWS
+    log.close()
+
+
+@pytest.mark.parametrize("keep", [0, 10, -8])
+def test_damaged_index_is_rebuilt(tmp_path, monkeypatch, keep):
+    path = write_file(tmp_path / "log.csv", FILES["trailing newline"][0])
+    MappedCsvLog(path, step=2).close()
+    with open(path + ".idx", mode="rb+") as file:
+        file.truncate(keep if keep >= 0 else os.path.getsize(path + ".idx") + keep)
+
+    builds = counting_builds(monkeypatch)
+    log = MappedCsvLog(path, step=2)
+    assert builds == [2]
+    assert list(log.rows()) == ROWS
+    log.close()
@@ -0,0 +1,229 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'EventRecorder'))
+
+from storage import CsvJournal, SqliteJournal, read_store  # noqa: E402
+
+ROWS = [
+    ["2024-01-01", "10:00:00", "a"],
+    ["2024-01-02", "10:00:00", "b"],
+    ["2024-01-03", "10:00:00", "c"],
+]
+
+
+def write_log(path, rows=ROWS):
+    CsvJournal(str(path)).rewrite(rows)
+    return str(path)
+
+
+def events(path):
+    store, errors = read_store(path)
+    return [row for row in store.rows()], errors
+
+
+def test_wal_is_replayed_in_order(tmp_path):
+    path = write_log(tmp_path / "log.csv")
+    journal = CsvJournal(path)
+    journal.log_rows([["2024-01-02", "12:00:00", "late"], ["2024-01-01", "11:00:00", "later"]])
+    assert os.path.exists(journal.wal_path)
+
+    rows, errors = events(path)
+    assert errors == []
+    assert [row[2] for row in rows] == ["a", "later", "b", "late", "c"]
+
+
+def test_late_insert_goes_to_the_wal(tmp_path):
+    path = write_log(tmp_path / "log.csv")
+    store, _ = read_store(path)
+    journal = CsvJournal(path)
+    position = store.insert(20240101120000, "late")
+    assert not journal.inserted(store, position)
+    assert journal.dirty == 1
+    assert [row[2] for row in events(path)[0]] == ["a", "late", "b", "c"]
+
+    journal.flush(store)
+    assert not os.path.exists(journal.wal_path)
+    assert [row[2] for row in events(path)[0]] == ["a", "late", "b", "c"]
+
+
+def test_torn_wal_line_is_dropped(tmp_path):
+    path = write_log(tmp_path / "log.csv")
+    journal = CsvJournal(path)
+    journal.log_rows([["2024-01-01", "11:00:00", "late"]])
+    with open(journal.wal_path, mode="a") as file:
+        file.write("2024-01-01,12:0")  # Cut short by a crash
+
+    rows, errors = events(path)
+    assert errors == []
+    assert [row[2] for row in rows] == ["a", "late", "b", "c"]
+
+    # The next late event isn't glued to the torn line
+    journal.log_rows([["2024-01-02", "11:00:00", "next"]])
+    rows, errors = events(path)
+    assert [row[2] for row in rows] == ["a", "late", "b", "next", "c"]
+    assert len(errors) == 1
+
+
+def test_stale_wal_is_ignored(tmp_path):
+    path = write_log(tmp_path / "log.csv")
+    journal = CsvJournal(path)
+    journal.log_rows([["2024-01-01", "11:00:00", "late"]])
+    with open(journal.wal_path, mode="rb") as file:
+        wal = file.read()
+    store, _ = read_store(path)
+
+    # Crash between the compaction's rename and removing the WAL
+    journal.save(store)
+    with open(journal.wal_path, mode="wb") as file:
+        file.write(wal)
+
+    rows, errors = events(path)
+    assert errors == []
+    assert [row[2] for row in rows] == ["a", "late", "b", "c"]
+
+    # A new late event starts a new WAL instead of adding to the stale one
+    journal.log_rows([["2024-01-02", "11:00:00", "next"]])
+    assert [row[2] for row in events(path)[0]] == ["a", "late", "b", "next", "c"]
+
+
+def test_append_after_torn_line(tmp_path):
+    path = str(tmp_path / "log.csv")
+    with open(path, mode="w", newline="") as file:
+        file.write("2024-01-01,10:00:00,a\r\n2024-01-01,11:0")
+    CsvJournal(path).append_rows([["2024-01-02", "10:00:00", "new"]])
+
+    rows, errors = events(path)
+    assert [row[2] for row in rows] == ["a", "new"]
+    assert [line for line, _ in errors] == [2]
+
+
+def test_append_to_complete_line_without_newline(tmp_path):
+    path = str(tmp_path / "log.csv")
+    with open(path, mode="w", newline="") as file:
+        file.write("2024-01-01,10:00:00,a")
+    CsvJournal(path).append_rows([["2024-01-02", "10:00:00", "new"]])
+    assert events(path) == ([["2024-01-01", "10:00:00", "a"], ["2024-01-02", "10:00:00", "new"]], [])
+
+
+@pytest.mark.parametrize("name", ["x#1.sqlite", "q?.sqlite", "p%41.sqlite", "with space.sqlite"])
+def test_sqlite_path_is_not_read_as_uri(tmp_path, name):
+    path = str(tmp_path / name)
+    SqliteJournal(path).rewrite(ROWS)
+    assert events(path) == (ROWS, [])
+
+
+def sqlite_log(tmp_path, rows):
+    path = str(tmp_path / "log.sqlite")
+    SqliteJournal(path).rewrite(rows)
+    store, _ = read_store(path)
+    return path, store
+
+
+def saved(path):
+    store, errors = read_store(path)
+    assert errors == []
+    return list(zip(store.stamps, store.events))
+
+
+DUPLICATES = [
+    ["2024-01-01", "10:00:00", "a"],
+    ["2024-01-01", "10:00:00", "a"],
+    ["2024-01-02", "10:00:00", "b"],
+    ["2024-01-02", "10:00:00", "b"],
+    ["2024-01-03", "10:00:00", "c"],
+]
+
+
+def test_sqlite_edits_are_saved_in_place(tmp_path):
+    path, store = sqlite_log(tmp_path, DUPLICATES)
+    journal = SqliteJournal(path)
+
+    # One of two identical rows gets a new text, then a new time
+    old = (store.stamps[1], store.events[1])
+    store.set_event(1, "a2")
+    journal.edited(old, (old[0], "a2"))
+    position = store.set_stamp(1, 20240102120000)
+    journal.edited((old[0], "a2"), (20240102120000, "a2"))
+    assert position == 3
+    assert not journal.replace_all
+    journal.flush(store)
+    journal.close()
+
+    assert journal.dirty == 0
+    assert saved(path) == list(zip(store.stamps, store.events))
+    assert [event for _, event in saved(path)] == ["a", "b", "b", "a2", "c"]
+
+
+def test_sqlite_deletes_are_saved_in_place(tmp_path):
+    path, store = sqlite_log(tmp_path, DUPLICATES)
+    journal = SqliteJournal(path)
+
+    # One of each pair of duplicates, in two ranges
+    ranges = [(1, 2), (3, 5)]
+    stamps = store.stamps[1:2] + store.stamps[3:5]
+    events = store.events[1:2] + store.events[3:5]
+    store.remove_ranges(ranges)
+    journal.removed(stamps, events)
+    journal.flush(store)
+    assert saved(path) == list(zip(store.stamps, store.events))
+    assert [event for _, event in saved(path)] == ["a", "b"]
+
+    # Everything before the second day
+    store.remove_ranges([(0, 1)])
+    journal.removed_before(20240102000000, 1)
+    journal.flush(store)
+    journal.close()
+    assert saved(path) == list(zip(store.stamps, store.events)) == [(20240102100000, "b")]
+
+
+def test_sqlite_changes_apply_in_order(tmp_path):
+    path, store = sqlite_log(tmp_path, ROWS)
+    journal = SqliteJournal(path)
+    journal.edited((20240102100000, "b"), (20240102100000, "b2"))
+    journal.removed([20240102100000], ["b2"])
+    journal.edited((20240103100000, "c"), (20240101090000, "c"))
+    journal.flush(store)
+    journal.close()
+    assert saved(path) == [(20240101090000, "c"), (20240101100000, "a")]
+
+
+def test_sqlite_reads_newest_first(tmp_path):
+    rows = [["2024-01-%02d" % day, "10:00:00", "e%d" % day] for day in range(1, 30)]
+    path, _ = sqlite_log(tmp_path, rows)
+    journal = SqliteJournal(path)
+    journal.batch_size = 4
+    batches = list(journal.read_batches(newest_first=True))
+    journal.close()
+
+    # Growing batches from the end of the log, each in order
+    assert [len(stamps) for stamps, _, _, _ in batches] == [4, 8, 16, 1]
+    assert [events for _, events, _, _ in batches][0] == ["e26", "e27", "e28", "e29"]
+    assert [event for _, events, _, _ in reversed(batches) for event in events] == [row[2] for row in rows]
+    progress = [done for _, _, _, done in batches]
+    assert progress == sorted(progress) and progress[-1] == 1.0
+
+
+def test_failed_sqlite_insert_waits_for_the_flush(tmp_path):
+    path, store = sqlite_log(tmp_path, ROWS)
+    journal = SqliteJournal(path)
+    journal.connect().execute("PRAGMA busy_timeout = 0")
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN EXCLUSIVE")
+
+    position = store.insert(20240104100000, "d")
+    with pytest.raises(OSError, match="locked"):
+        journal.inserted(store, position)
+    with pytest.raises(OSError):
+        journal.flush(store)
+    assert journal.dirty == 1
+
+    other.execute("COMMIT")
+    other.close()
+    journal.flush(store)
+    journal.close()
+    assert journal.dirty == 0
+    assert saved(path) == list(zip(store.stamps, store.events))